@@ -89,6 +89,11 @@ and three optional arguments.
   - `scheme`: Loki Push Api endpoint scheme (`HTTP` or `HTTPS`). Default value: `HTTP`
   - `address`: Loki Push Api endpoint address. Default value: `localhost`
   - `path`: Loki Push Api endpoint path. Default value: `loki/api/v1/push`
+  - `tenant_id`: An optional callable returning the tenant ID, if any, that the application
+    related over a given relation must push its logs as. For a Loki running in multi-tenant
+    mode. Default value: `None`
+  - `otlp_enabled`: An optional callable returning whether Loki accepts logs over OTLP. If it
+    does, the endpoint also advertises the base URL of the OTLP endpoint. Default value: `None`
 
 
 The `LokiPushApiProvider` object has several responsibilities:
@@ -448,6 +453,21 @@ The following labels are automatically added to every alert
 - `juju_application`
 
 
+## Recording Rules
+
+Rule files may also contain
+[recording rules](https://grafana.com/docs/loki/latest/alert/#recording-rules), with a `record`
+key instead of `alert`. They are gathered and forwarded like alert rules, and the Loki ruler
+pushes their results as metrics to the Prometheus-compatible remote-write endpoints it is
+related to. Dashboards can then query these cheap metrics instead of scanning the logs on every
+refresh:
+
+```yaml
+record: job:loki_error_lines:rate5m
+expr: |
+  sum(rate({%%juju_topology%%} |= "error" [5m])) by (job)
+```
+
 Whether alert rules files does not contain the keys `alert` or `expr` or there is no alert
 rules file in `alert_rules_path` a `loki_push_api_alert_rules_error` event is emitted.
 
@@ -511,7 +531,7 @@ from gzip import GzipFile
 from hashlib import sha256
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 from urllib import request
 from urllib.error import URLError
 
@@ -544,7 +564,7 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 30
+LIBPATCH = 33
 
 PYDEPS = ["cosl"]
 
@@ -885,6 +905,8 @@ class LokiPushApiProvider(Object):
         scheme: str = "http",
         address: str = "",
         path: str = "loki/api/v1/push",
+        tenant_id: Optional[Callable[[Relation], Optional[str]]] = None,
+        otlp_enabled: Optional[Callable[[], bool]] = None,
     ):
         """A Loki service provider.
 
@@ -902,6 +924,13 @@ class LokiPushApiProvider(Object):
                 It is kept for backward compatibility.
                 Use `update_endpoint()` instead.
             path: an optional path of the Loki API URL (default is "loki/api/v1/push")
+            tenant_id: an optional callable returning the tenant ID, if any, that the
+                application related over the given relation must push its logs as. It is
+                advertised in the `tenant_id` field of the endpoint, and the alert rules of
+                the relation are returned for that tenant.
+            otlp_enabled: an optional callable returning whether Loki accepts logs over OTLP,
+                in which case the base URL of the OTLP endpoint is advertised in the
+                `otlp_endpoint` field of the endpoint.
 
         Raises:
             RelationNotFoundError: If there is no relation in the charm's metadata.yaml
@@ -933,6 +962,8 @@ class LokiPushApiProvider(Object):
         self.scheme = scheme
         self.path = path
         self._custom_url = None
+        self._tenant_id = tenant_id or (lambda _: None)
+        self._otlp_enabled = otlp_enabled or (lambda: False)
 
         events = self._charm.on[relation_name]
         self.framework.observe(self._charm.on.upgrade_charm, self._on_lifecycle_event)
@@ -1099,9 +1130,10 @@ class LokiPushApiProvider(Object):
         if url:
             self._custom_url = url
 
-        endpoint = self._endpoint(self._custom_url or self._url)
+        url = self._custom_url or self._url
 
         for relation in relations_list:
+            endpoint = self._endpoint(url, self._tenant_id(relation))
             relation.data[self._charm.unit].update({"endpoint": json.dumps(endpoint)})
 
         logger.debug("Saved endpoint in unit relation data")
@@ -1114,16 +1146,23 @@ class LokiPushApiProvider(Object):
         """
         return f"{self.scheme}://{socket.getfqdn()}:{self.port}"
 
-    def _endpoint(self, url) -> dict:
+    def _endpoint(self, url, tenant_id: Optional[str] = None) -> dict:
         """Get Loki push API endpoint for a given url.
 
         Args:
             url: A loki unit URL.
+            tenant_id: An optional tenant ID that logs must be pushed as.
 
         Returns: str
         """
-        endpoint = "/loki/api/v1/push"
-        return {"url": url.rstrip("/") + endpoint}
+        endpoint = {"url": url.rstrip("/") + "/loki/api/v1/push"}
+        if self._otlp_enabled():
+            # OTLP exporters append the signal path, i.e. "/v1/logs", to the base URL.
+            endpoint["otlp_endpoint"] = url.rstrip("/") + "/otlp"
+        if tenant_id:
+            # Same name as in Promtail's client config, which sends it as the X-Scope-OrgID header.
+            endpoint["tenant_id"] = tenant_id
+        return endpoint
 
     @property
     def alerts(self) -> dict:  # noqa: C901
@@ -1145,6 +1184,9 @@ class LokiPushApiProvider(Object):
         - model_uuid
         - application
 
+        and, if the `tenant_id` callable returns one for the relation, a `tenant_id` key with
+        the tenant the alert rules must be evaluated for.
+
         The value of the `groups` key is such that it may be used to generate
         a Loki alert rules file directly using `yaml.dump` but the
         `groups` key itself must be included as this is required by Loki,
@@ -1206,6 +1248,8 @@ class LokiPushApiProvider(Object):
                 event_data.pop("errors", None)
                 relation.data[self._charm.app]["event"] = json.dumps(event_data)
 
+            if tenant_id := self._tenant_id(relation):
+                alert_rules["tenant_id"] = tenant_id
             alerts[identifier] = alert_rules
 
         return alerts
@@ -1383,6 +1427,10 @@ class ConsumerBase(Object):
                 {"url": "http://loki1:3100/loki/api/v1/push"},
                 {"url": "http://loki2:3100/loki/api/v1/push"},
             ]
+            When Loki runs in multi-tenant mode, an endpoint also has a "tenant_id", which
+            clients must send in the X-Scope-OrgID header of their push requests.
+            When Loki accepts logs over OTLP, an endpoint also has an "otlp_endpoint", e.g.
+            "http://loki1:3100/otlp", for OTLP/HTTP exporters.
         """
         endpoints = []
         seen_urls = set()
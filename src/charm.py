@@ -13,21 +13,24 @@ develop a new k8s charm using the Operator Framework:
 """
 
 import datetime
+import hashlib
+import json
 import logging
 import os
 import re
 import socket
 import ssl
 import subprocess
-import time
 import urllib.request
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, TypedDict, cast
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypedDict, cast
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
+from xml.etree import ElementTree
 
 import ops
+import requests
 import yaml
 from charms.alertmanager_k8s.v1.alertmanager_dispatch import AlertmanagerConsumer
 from charms.catalogue_k8s.v1.catalogue import CatalogueConsumer, CatalogueItem
@@ -56,7 +59,8 @@ from charms.tls_certificates_interface.v4.tls_certificates import (
 from charms.traefik_k8s.v1.ingress_per_unit import IngressPerUnitRequirer
 from cosl import JujuTopology
 from cosl.interfaces.datasource_exchange import DatasourceDict, DatasourceExchange
-from ops import CollectStatusEvent, StoredState
+from lightkube.utils.quantity import parse_quantity
+from ops import ActionEvent, CollectStatusEvent, StoredState
 from ops.charm import CharmBase
 from ops.main import main
 from ops.model import (
@@ -65,21 +69,42 @@ from ops.model import (
     MaintenanceStatus,
     Port,
     Relation,
+    SecretNotFoundError,
     StatusBase,
+    Unit,
     WaitingStatus,
 )
 from ops.pebble import Error, Layer, PathError, ProtocolError
 
 from config_builder import (
+    CACHE_BACKENDS,
     CERT_FILE,
+    CHUNK_ENCODINGS,
     CHUNKS_DIR,
+    GRPC_LISTEN_PORT,
     HTTP_LISTEN_PORT,
     KEY_FILE,
     LOKI_CONFIG,
     LOKI_CONFIG_BACKUP,
+    MAX_REPLICATION_FACTOR,
+    MEMBERLIST_PORT,
+    MEMCACHED_PORT,
+    PERFORMANCE_PROFILES,
+    RULER_EVALUATION_MODES,
     RULES_DIR,
+    RUNTIME_CONFIG,
+    SCALABLE_TARGETS,
+    SINGLE_TENANT_ID,
     ConfigBuilder,
+    S3Config,
+    is_valid_byte_size,
+    is_valid_duration,
+    parse_otlp_attributes,
+    parse_retention_streams,
+    parse_tenant_limits,
+    v13_effective_today,
 )
+from object_storage import bucket_usage
 
 # To keep a tidy debug-log, we suppress some DEBUG/INFO logs from some imported libs,
 # even when charm logging is set to a lower level.
@@ -87,6 +112,11 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Name of the Pebble check which reports whether Loki is ready to serve requests.
+READY_CHECK = "ready"
+# Label of the unit secret which keeps the last known settings of the object storage bucket.
+S3_SECRET_LABEL = "s3-bucket"
+
 @dataclass
 class TLSConfig:
     """TLS configuration received by the charm over the `certificates` relation."""
@@ -117,6 +147,25 @@ def to_status(tpl: Tuple[str, str]) -> StatusBase:
     return StatusBase.from_name(name, message)
 
 
+def _metric_value(metrics: str, name: str) -> Optional[float]:
+    """Return the value of an unlabelled metric from a Prometheus text exposition, if present."""
+    if match := re.search(rf"^{name} (\S+)$", metrics, re.MULTILINE):
+        return float(match.group(1))
+    return None
+
+
+def _parse_targets(value: str) -> Optional[List[str]]:
+    """Parse the "target" config option into a list of targets, or None if it is invalid."""
+    if value == "all":
+        return ["all"]
+    targets = [target.strip() for target in value.split(",")]
+    return targets if all(target in SCALABLE_TARGETS for target in targets) else None
+
+
+def _unit_number(unit: Unit) -> int:
+    return int(unit.name.rsplit("/", 1)[-1])
+
+
 @log_charm(logging_endpoints="_charm_logging_endpoints", server_cert="_charm_logging_ca_cert")
 class LokiOperatorCharm(CharmBase):
     """Charm the service."""
@@ -142,10 +191,32 @@ class LokiOperatorCharm(CharmBase):
                 rules=to_tuple(ActiveStatus()),
                 retention=to_tuple(ActiveStatus()),
             ),
+            memcached_started=False,
+            # Number of rules in the rule files, which sizes the ruler evaluation settings.
+            rule_count=0,
+            # Digest of the TLS material and received CA certificates last written to the containers.
+            cert_digest="",
+            # Digests of the config files last pushed to the workload, trusted until it restarts.
+            config_digest="",
+            runtime_config_digest="",
+            # Digests of the alert rules files last pushed, by path relative to the rules dir.
+            alert_rules_digests={},
+            # Whether the alert rules files were last laid out by tenant, in multi-tenant mode.
+            alert_rules_multi_tenant=False,
+            # Whether Loki restarted since the alert rules were last verified.
+            alert_rules_unverified=False,
+            # Whether the OTLP endpoint was last advertised, for when the workload is unreachable.
+            otlp_enabled=False,
         )
+        # The backup config, parsed at most once per dispatch; {} if it is missing.
+        self._backup_config_cache: Optional[Dict[str, Any]] = None
+        # Properties that are slow to compute and consulted many times in a dispatch, by name.
+        # They are invalidated when the certificates or the ingress change in the dispatch.
+        self._dispatch_cache: Dict[str, Any] = {}
 
         self._loki_container = self.unit.get_container(self._name)
         self._node_exporter_container = self.unit.get_container("node-exporter")
+        self._memcached_container = self.unit.get_container("memcached")
         self.unit.set_ports(self._port)
 
         self._juju_topology = JujuTopology.from_charm(self)
@@ -153,10 +224,12 @@ class LokiOperatorCharm(CharmBase):
         # If Loki is run in single-tenant mode, all the chunks are put in a folder named "fake"
         # https://grafana.com/docs/loki/latest/operations/storage/filesystem/
         # https://grafana.com/docs/loki/latest/rules/#ruler-storage
-        tenant_id = "fake"
-        self.rules_dir_tenant = os.path.join(RULES_DIR, tenant_id)
+        self.rules_dir_tenant = os.path.join(RULES_DIR, SINGLE_TENANT_ID)
 
-        self.unit.set_ports(Port("tcp", self._port))
+        self.unit.set_ports(
+            Port("tcp", self._port), Port("tcp", GRPC_LISTEN_PORT), Port("tcp", MEMBERLIST_PORT)
+        )
+        self._invalid_config_options: List[str] = []
 
         self.resources_patch = KubernetesComputeResourcesPatch(
             self,
@@ -216,7 +289,9 @@ class LokiOperatorCharm(CharmBase):
                 self._cert_requirer.on.certificate_available,
             ],
             source_type="loki",
-            app_datasource_url=self.ingress_per_unit.url or self._service_url,
+            app_datasource_url=self._datasource_url,
+            extra_fields=self._datasource_extra_fields,
+            secure_extra_fields=self._datasource_secure_extra_fields,
         )
 
         self.metrics_provider = MetricsEndpointProvider(
@@ -238,6 +313,8 @@ class LokiOperatorCharm(CharmBase):
             port=external_url.port or 443 if self._tls_available else 80,
             scheme=external_url.scheme,
             path=f"{external_url.path}{self._loki_push_api_endpoint}",
+            tenant_id=self._tenant_id,
+            otlp_enabled=lambda: self._otlp_enabled,
         )
 
         self.dashboard_provider = GrafanaDashboardProvider(self)
@@ -266,16 +343,33 @@ class LokiOperatorCharm(CharmBase):
             self.workload_tracing.on.endpoint_removed,  # type: ignore
             self._on_workload_tracing_endpoint_removed,
         )
+        self.framework.observe(self.on.s3_relation_joined, self._on_s3_changed)
+        self.framework.observe(self.on.s3_relation_changed, self._on_s3_changed)
+        self.framework.observe(self.on.s3_relation_broken, self._on_s3_changed)
+        self.framework.observe(
+            self.on.send_remote_write_relation_changed, self._on_remote_write_changed
+        )
+        self.framework.observe(
+            self.on.send_remote_write_relation_departed, self._on_remote_write_changed
+        )
+        self.framework.observe(
+            self.on.send_remote_write_relation_broken, self._on_remote_write_changed
+        )
 
         self.framework.observe(self.on.config_changed, self._on_config_changed)
+        self.framework.observe(self.on.update_status, self._on_update_status)
         self.framework.observe(self.on.upgrade_charm, self._on_upgrade_charm)
         self.framework.observe(self.on.loki_pebble_ready, self._on_loki_pebble_ready)
         self.framework.observe(
             self.on.node_exporter_pebble_ready, self._on_node_exporter_pebble_ready
         )
+        self.framework.observe(self.on.memcached_pebble_ready, self._on_memcached_pebble_ready)
         self.framework.observe(
             self.on.loki_pebble_check_failed, self._on_loki_pebble_check_failed
         )
+        self.framework.observe(
+            self.on.loki_pebble_check_recovered, self._on_loki_pebble_check_recovered
+        )
 
         self.framework.observe(
             self.loki_provider.on.loki_push_api_alert_rules_changed,
@@ -302,6 +396,12 @@ class LokiOperatorCharm(CharmBase):
             self.on.grafana_source_relation_departed, self._on_grafana_source_changed
         )
 
+        self.framework.observe(self.on.replicas_relation_joined, self._on_peers_changed)
+        self.framework.observe(self.on.replicas_relation_changed, self._on_peers_changed)
+        self.framework.observe(self.on.replicas_relation_departed, self._on_peers_changed)
+
+        self.framework.observe(self.on.storage_usage_action, self._on_storage_usage_action)
+
         self.framework.observe(self.on.collect_unit_status, self._on_collect_unit_status)
 
     ##############################################
@@ -314,15 +414,35 @@ class LokiOperatorCharm(CharmBase):
     def _on_collect_unit_status(self, event: CollectStatusEvent):
         # "Pull" statuses
         # TODO refactor _configure to turn the "rules" status into a "pull" status.
+        if wal_replay_status := self._wal_replay_status():
+            event.add_status(wal_replay_status)
 
         # "Push" statuses
         for status in self._stored.status.values():
             event.add_status(to_status(status))
 
+    def _on_storage_usage_action(self, event: ActionEvent):
+        results = {"local-chunks-bytes": self._chunks_size(), "local-wal-bytes": self._wal_size()}
+        if s3 := self._s3_config:
+            try:
+                objects, size = bucket_usage(s3)
+            except (requests.RequestException, ElementTree.ParseError) as e:
+                event.fail(f"Failed to list the objects in the {s3.bucket} bucket: {e}")
+                return
+            results.update({"s3-objects": objects, "s3-bytes": size})
+        event.set_results(results)
+
     def _on_config_changed(self, _):
         self._configure()
 
+    def _on_update_status(self, _):
+        # Loki may have become ready after a restart without its ready check ever failing.
+        if self._loki_ready:
+            self._recheck_alert_rules()
+
     def _on_upgrade_charm(self, _):
+        # The charm container may be new, e.g. after a pod churn, so the certificates must be rewritten.
+        self._stored.cert_digest = ""
         self._configure()
 
     def _on_loki_pebble_check_failed(self, event):
@@ -334,8 +454,16 @@ class LokiOperatorCharm(CharmBase):
         """
         if event.info.name == "schema-migration":
             self._configure()
+        elif event.info.name == READY_CHECK:
+            logger.warning("Loki is not ready; the alert rules will be verified once it is.")
+
+    def _on_loki_pebble_check_recovered(self, event):
+        """Verify the alert rules once Loki reports ready, e.g. after a restart."""
+        if event.info.name == READY_CHECK:
+            self._recheck_alert_rules()
 
     def _on_certificate_available(self, _):
+        self._invalidate_dispatch_cache()
         self._update_cert()
         self._configure()
 
@@ -343,6 +471,9 @@ class LokiOperatorCharm(CharmBase):
         self._update_cert()
 
     def _on_loki_pebble_ready(self, _):
+        # The workload container may have restarted with a fresh filesystem.
+        self._stored.cert_digest = ""
+        self._stored.config_digest = self._stored.runtime_config_digest = ""
         if self._ensure_alert_rules_path():
             self._regenerate_alert_rules()
         self._configure()
@@ -358,17 +489,34 @@ class LokiOperatorCharm(CharmBase):
         self._node_exporter_container.replan()
         logger.info("Node Exporter started")
 
+    def _on_memcached_pebble_ready(self, _):
+        self._configure()
+
+    def _on_s3_changed(self, _):
+        self._request_bucket()
+        self._configure()
+
+    def _on_remote_write_changed(self, _):
+        self._configure()
+
+    def _on_peers_changed(self, _):
+        self._configure()
+
     def _on_alertmanager_change(self, _):
         self._configure()
 
     def _on_ingress_changed(self, _):
+        self._invalidate_dispatch_cache()
         self._configure()
 
     def _on_logging_relation_changed(self, event):
         # If there is a change in logging relation, let's update Loki endpoint
         # We are listening to relation_change to handle the Loki scale down to 0 and scale up again
         # when it is related with ingress. If not, endpoints will end up outdated in consumer side.
-        self.loki_provider.update_endpoint(url=self._external_url, relation=event.relation)
+        self.loki_provider.update_endpoint(url=self._push_api_url, relation=event.relation)
+        if self._multi_tenant:
+            # The related application is a new tenant, which needs limits.
+            self._configure()
 
     def _on_workload_tracing_endpoint_changed(self, _) -> None:
         """Adds workload tracing information to loki's config."""
@@ -387,6 +535,134 @@ class LokiOperatorCharm(CharmBase):
         """Return the peer relation, or None if not yet available."""
         return self.model.get_relation("replicas")
 
+    @property
+    def _multi_tenant(self) -> bool:
+        return bool(self.config["multi-tenant"])
+
+    def _tenant_id(self, relation: Relation) -> Optional[str]:
+        """Tenant ID of the application related over a logging relation, in multi-tenant mode."""
+        if not (self._multi_tenant and relation.app):
+            return None
+        return relation.app.name
+
+    @property
+    def _tenants(self) -> List[str]:
+        """Tenant IDs of all the applications pushing logs, in multi-tenant mode."""
+        tenants = (self._tenant_id(relation) for relation in self.model.relations["logging"])
+        return sorted({tenant for tenant in tenants if tenant})
+
+    @property
+    def _datasource_extra_fields(self) -> Optional[Dict[str, str]]:
+        # In multi-tenant mode, Grafana queries the logs of all the tenants at once.
+        # Ref: https://grafana.com/docs/loki/latest/operations/multi-tenancy/
+        return {"httpHeaderName1": "X-Scope-OrgID"} if self._tenants else None
+
+    @property
+    def _datasource_secure_extra_fields(self) -> Optional[Dict[str, str]]:
+        if not self._tenants:
+            return None
+        # The logs pushed before the multi-tenant mode was enabled belong to the single tenant.
+        return {"httpHeaderValue1": "|".join(sorted({SINGLE_TENANT_ID, *self._tenants}))}
+
+    @property
+    def _targets(self) -> List[str]:
+        """Loki targets assigned to the units in turn, by unit number."""
+        return _parse_targets(str(self.config["target"])) or ["all"]
+
+    @property
+    def _scalable(self) -> bool:
+        """Whether the units split the Loki components between them."""
+        return self._targets != ["all"]
+
+    def _target_of(self, unit_number: int) -> str:
+        return self._targets[unit_number % len(self._targets)]
+
+    @property
+    def _unit_hostnames(self) -> Dict[int, str]:
+        """Hostnames of the units of this application known to this unit, by unit number."""
+        hostnames = {_unit_number(self.unit): self.hostname}
+        if peers := self._peers:
+            for unit in peers.units:
+                if hostname := peers.data[unit].get("hostname"):
+                    hostnames[_unit_number(unit)] = hostname
+        return dict(sorted(hostnames.items()))
+
+    def _unit_url(self, target: str) -> Optional[str]:
+        """URL of the first known unit running the given target, if any."""
+        scheme = "https" if self._tls_available else "http"
+        for unit_number, hostname in self._unit_hostnames.items():
+            if self._target_of(unit_number) == target:
+                return f"{scheme}://{hostname}:{self._port}"
+        return None
+
+    @property
+    def _replication_factor(self) -> int:
+        """Replication factor of the ingester ring, given the write units known to this unit."""
+        if not self._scalable:
+            return 1
+        # The unit numbers are not contiguous after a scale down, so the known units are counted.
+        write_units = [n for n in self._unit_hostnames if self._target_of(n) == "write"]
+        # A quorum of 2 replicas out of 2 would stop the ingestion whenever a write unit restarts.
+        return MAX_REPLICATION_FACTOR if len(write_units) >= MAX_REPLICATION_FACTOR else 1
+
+    @property
+    def _memberlist_join_members(self) -> List[str]:
+        """Memberlist addresses of all the units, which share the rings in the scalable mode."""
+        if not self._scalable:
+            return []
+        return [f"{hostname}:{MEMBERLIST_PORT}" for hostname in self._unit_hostnames.values()]
+
+    @property
+    def _compactor_address(self) -> str:
+        """URL of the compactor, which only runs on the backend units in the scalable mode."""
+        if not self._scalable:
+            return ""
+        return self._unit_url("backend") or ""
+
+    @property
+    def _otlp_enabled(self) -> bool:
+        """Whether logs can be pushed over OTLP, which stores attributes as structured metadata."""
+        if not self.config["otlp-ingestion"]:
+            return False
+        # The library asks from its own handlers too, which also run while Pebble is unreachable,
+        # e.g. on upgrade-charm. The migration dates cannot be read from the backup then.
+        if not self._loki_container.can_connect():
+            return self._stored.otlp_enabled
+        self._stored.otlp_enabled = v13_effective_today(self._tsdb_versions_migration_dates)
+        return self._stored.otlp_enabled
+
+    @property
+    def _query_frontend_address(self) -> str:
+        """Address of the query frontend gRPC server, which only runs on the read units in the scalable mode."""
+        if not self._scalable:
+            return ""
+        for unit_number, hostname in self._unit_hostnames.items():
+            if self._target_of(unit_number) == "read":
+                return f"{hostname}:{GRPC_LISTEN_PORT}"
+        return ""
+
+    @property
+    def _runs_ruler(self) -> bool:
+        """Whether this unit runs the ruler, which only runs on the backend units in the scalable mode."""
+        return self._target_of(_unit_number(self.unit)) in ("all", "backend")
+
+    @property
+    def _datasource_url(self) -> str:
+        """URL that Grafana queries, which must be served by a unit running the read path."""
+        if not self._scalable:
+            return self._ingress_url or self._service_url
+        # The K8s service also balances the queries to the write and backend units.
+        if self._target_of(_unit_number(self.unit)) == "read":
+            return self._ingress_url or self.internal_url
+        return self._unit_url("read") or self._service_url
+
+    @property
+    def _push_api_url(self) -> str:
+        """URL that log producers push to, which must be served by a unit running the write path."""
+        if self._target_of(_unit_number(self.unit)) in ("all", "write"):
+            return self._external_url
+        return self._unit_url("write") or self._external_url
+
     def _peer_data_get(self, key: str) -> str:
         """Returns the value of a given key from the peer data or empty string if the peer relation is unavailable or the key is absent."""
         if (peers := self._peers) is None:
@@ -446,7 +722,7 @@ class LokiOperatorCharm(CharmBase):
         Returns:
             a Pebble layer specification for the Loki workload container.
         """
-        env = {}
+        env = self._go_runtime_env
         if self.workload_tracing.is_ready():
             tempo_endpoint = self.workload_tracing.get_endpoint("jaeger_thrift_http")
             topology = self._juju_topology
@@ -474,6 +750,15 @@ class LokiOperatorCharm(CharmBase):
                     },
                 },
                 "checks": {
+                    # Loki is not ready until the WAL has been replayed and the ingester has
+                    # joined the ring. The transitions of this check drive rule verification.
+                    READY_CHECK: {
+                        "override": "replace",
+                        "level": "ready",
+                        "period": "10s",
+                        "threshold": 1,
+                        "http": {"url": f"{self._internal_url}/ready"},
+                    },
                     "schema-migration": {
                         "override": "replace",
                         "level": "alive",
@@ -491,6 +776,25 @@ class LokiOperatorCharm(CharmBase):
 
         return pebble_layer
 
+    @property
+    def _go_runtime_env(self) -> Dict[str, str]:
+        """Go runtime settings which keep the Loki heap within the memory limit.
+
+        GOMEMLIMIT makes the garbage collector work harder as the heap approaches the memory
+        limit, instead of letting it overshoot the limit and get OOM-killed.
+        """
+        env = {}
+        _, memory_limit = self._resource_limits
+        headroom = self._validated_config(
+            "go-memory-limit-headroom-percent", lambda v: 0 <= v < 100
+        )
+        if memory_limit:
+            env["GOMEMLIMIT"] = f"{memory_limit * (100 - headroom) // 100 // 2**20}MiB"
+        gogc = self._validated_config("gogc", lambda v: v in ("", "off") or v.isdigit())
+        if gogc:
+            env["GOGC"] = gogc
+        return env
+
     @property
     def _node_exporter_pebble_layer(self) -> Layer:
         """Construct the pebble layer.
@@ -515,6 +819,33 @@ class LokiOperatorCharm(CharmBase):
 
         return pebble_layer
 
+    def _memcached_pebble_layer(self, enabled: bool) -> Layer:
+        """Construct the pebble layer.
+
+        Returns:
+            a Pebble layer specification for the memcached sidecar container.
+        """
+        memory_mb = self._validated_config("memcached-memory-mb", lambda v: v >= 64)
+        return Layer(
+            {
+                "summary": "memcached layer",
+                "description": "pebble config layer for the memcached chunks and results cache",
+                "services": {
+                    "memcached": {
+                        "override": "replace",
+                        "summary": "memcached",
+                        # Loki chunks can exceed memcached's default item size limit of 1MB.
+                        # Loki, its only client, runs in the same pod: the unauthenticated cache
+                        # must not be reachable from the rest of the cluster.
+                        "command": (
+                            f"memcached -m {memory_mb} -I 2m -l 127.0.0.1 -p {MEMCACHED_PORT} -U 0"
+                        ),
+                        "startup": "enabled" if enabled else "disabled",
+                    },
+                },
+            }
+        )
+
     @property
     def _node_exporter_args(self) -> str:
         args = [
@@ -527,7 +858,9 @@ class LokiOperatorCharm(CharmBase):
     @property
     def hostname(self) -> str:
         """Unit's hostname."""
-        return socket.getfqdn()
+        if "hostname" not in self._dispatch_cache:
+            self._dispatch_cache["hostname"] = socket.getfqdn()
+        return self._dispatch_cache["hostname"]
 
     @property
     def internal_url(self):
@@ -538,7 +871,19 @@ class LokiOperatorCharm(CharmBase):
     @property
     def _external_url(self) -> str:
         """Return the external hostname to be passed to ingress via the relation."""
-        if ingress_url := self.ingress_per_unit.url:
+        if "external_url" not in self._dispatch_cache:
+            self._dispatch_cache["external_url"] = self._compute_external_url()
+        return self._dispatch_cache["external_url"]
+
+    @property
+    def _ingress_url(self) -> Optional[str]:
+        """This unit's ingress URL, if any."""
+        if "ingress_url" not in self._dispatch_cache:
+            self._dispatch_cache["ingress_url"] = self.ingress_per_unit.url
+        return self._dispatch_cache["ingress_url"]
+
+    def _compute_external_url(self) -> str:
+        if ingress_url := self._ingress_url:
             logger.debug("This unit's ingress URL: %s", ingress_url)
             return ingress_url
 
@@ -565,13 +910,9 @@ class LokiOperatorCharm(CharmBase):
 
     @property
     def loki_scrape_jobs(self) -> List[Dict[str, Any]]:
-        """Generate scrape jobs.
-
-        Note: We're generating a scrape job for the leader only because loki is not intended to
-        be scaled beyond one unit. If we wanted to scrape all potential units, we would need
-        to collect all the peer addresses over peer relation data.
-        """
-        job: Dict[str, Any] = {"static_configs": [{"targets": [f"{self.hostname}:{self._port}"]}]}
+        """Generate scrape jobs for all the units, whose addresses are shared over the peer relation."""
+        targets = [f"{hostname}:{self._port}" for hostname in self._unit_hostnames.values()]
+        job: Dict[str, Any] = {"static_configs": [{"targets": targets}]}
 
         if self._tls_available:
             job["scheme"] = "https"
@@ -581,18 +922,24 @@ class LokiOperatorCharm(CharmBase):
     @property
     def node_exporter_scrape_jobs(self) -> List[Dict[str, Any]]:
         """Generate scrape jobs for the node exporter."""
-        job: Dict[str, Any] = {"static_configs": [{"targets": [f"{self.hostname}:9100"]}]}
+        targets = [f"{hostname}:9100" for hostname in self._unit_hostnames.values()]
+        job: Dict[str, Any] = {"static_configs": [{"targets": targets}]}
         return [job]
 
 
     @property
     def _tls_config(self) -> Optional[TLSConfig]:
-        certificates, key = self._cert_requirer.get_assigned_certificate(
-            certificate_request=self._csr_attributes
-        )
-        if not (key and certificates):
-            return None
-        return TLSConfig(certificates.certificate.raw, certificates.ca.raw, key.raw)
+        # The certificates are read from secrets and parsed, so they are only fetched once.
+        if "tls_config" not in self._dispatch_cache:
+            certificates, key = self._cert_requirer.get_assigned_certificate(
+                certificate_request=self._csr_attributes
+            )
+            self._dispatch_cache["tls_config"] = (
+                TLSConfig(certificates.certificate.raw, certificates.ca.raw, key.raw)
+                if key and certificates
+                else None
+            )
+        return self._dispatch_cache["tls_config"]
 
     @property
     def _tls_available(self) -> bool:
@@ -601,6 +948,10 @@ class LokiOperatorCharm(CharmBase):
     ##############################################
     #             UTILITY METHODS                #
     ##############################################
+    def _invalidate_dispatch_cache(self):
+        """Forget the cached certificates and URLs, after they changed in this dispatch."""
+        self._dispatch_cache.clear()
+
     def _configure(self):  # noqa: C901
         """Configure Loki charm."""
         # "is_ready" is a racy check, so we do it once here (instead of in collect-status)
@@ -643,8 +994,42 @@ class LokiOperatorCharm(CharmBase):
         # operations fail, better to let the charm go into error state than setting blocked.
         self._update_cert()
 
+        # Share this unit's address with the other units, for the memberlist ring and scrape jobs.
+        if peers := self._peers:
+            peers.data[self.unit]["hostname"] = self.hostname
+
         source_data = self._sorted_source_data()
-        config = ConfigBuilder(
+        cpu_limit, memory_limit = self._resource_limits
+        tsdb_versions_migration_dates = self._tsdb_versions_migration_dates
+        s3 = self._s3_config
+        if s3:
+            self._save_s3_config(s3)
+        elif self._get_schema_config_version_migration_date_from_backup("v13", object_store="s3"):
+            # The object storage period must always be rendered once it was, or the chunks in the
+            # bucket become unreadable, and the period is dropped from the backup config for good.
+            s3 = self._saved_s3_config
+            if not s3:
+                self._stored.status["config"] = to_tuple(
+                    BlockedStatus("Chunks are stored in object storage: relate to s3")
+                )
+                return
+            if self.model.get_relation("s3"):
+                status = WaitingStatus("Waiting for the s3 relation data; using the last bucket")
+            else:
+                status = BlockedStatus("Missing s3 relation; using the last known bucket")
+            self._stored.status["config"] = to_tuple(status)
+        if self._scalable and not s3:
+            # The read units cannot see the chunks flushed to the filesystem of the write units.
+            self._stored.status["config"] = to_tuple(
+                BlockedStatus("The scalable mode requires object storage: relate to s3")
+            )
+            return
+        self._invalid_config_options = []
+        self._validated_config("target", lambda v: _parse_targets(v) is not None)
+        memcached_address = self._configure_memcached(
+            self._validated_config("cache-backend", lambda v: v in CACHE_BACKENDS) == "memcached"
+        )
+        config_builder = ConfigBuilder(
             instance_addr=self.hostname,
             alertmanager_url=self._alerting_config(),
             external_url=self._external_url,
@@ -652,50 +1037,222 @@ class LokiOperatorCharm(CharmBase):
             ingestion_burst_size_mb=int(self.config["ingestion-burst-size-mb"]),
             retention_period=int(self.config["retention-period"]),
             http_tls=self._tls_available,
-            tsdb_versions_migration_dates=self._tsdb_versions_migration_dates,
+            tsdb_versions_migration_dates=tsdb_versions_migration_dates,
             reporting_enabled=bool(self.config["reporting-enabled"]),
             grafana_external_url=source_data.external_url,
             datasource_uid=source_data.get_unit_uid(self.unit.name),
-        ).build()
+            performance_profile=self._validated_config(
+                "performance-profile", lambda v: v in PERFORMANCE_PROFILES
+            ),
+            cpu_limit=cpu_limit,
+            memory_limit=memory_limit,
+            embedded_cache_memory_percent=self._validated_config(
+                "embedded-cache-memory-percent", lambda v: 0 <= v <= 50
+            ),
+            embedded_cache_ttl=self._validated_config("embedded-cache-ttl", is_valid_duration),
+            memcached_address=memcached_address,
+            query_split_interval=self._validated_config("query-split-interval", is_valid_duration),
+            max_query_parallelism=self._validated_config("max-query-parallelism", lambda v: v >= 0),
+            tsdb_max_query_parallelism=self._validated_config(
+                "tsdb-max-query-parallelism", lambda v: v >= 0
+            ),
+            query_sharding=bool(self.config["query-sharding"]),
+            max_entries_limit_per_query=self._validated_config(
+                "max-entries-limit-per-query", lambda v: v >= 0
+            ),
+            max_query_series=self._validated_config("max-query-series", lambda v: v >= 0),
+            max_query_length=self._validated_config(
+                "max-query-length", lambda v: v == "" or is_valid_duration(v)
+            ),
+            max_query_lookback=self._validated_config("max-query-lookback", is_valid_duration),
+            query_timeout=self._validated_config(
+                "query-timeout", lambda v: v != "0" and is_valid_duration(v)
+            ),
+            max_streams_matchers_per_query=self._validated_config(
+                "max-streams-matchers-per-query", lambda v: v > 0
+            ),
+            log_queries_longer_than=self._validated_config(
+                "log-queries-longer-than", is_valid_duration
+            ),
+            query_stats_enabled=bool(self.config["query-stats-enabled"]),
+            remote_write_urls=self._remote_write_urls,
+            rule_count=self._stored.rule_count,
+            ruler_evaluation_interval=self._validated_config(
+                "ruler-evaluation-interval", lambda v: v != "0" and is_valid_duration(v)
+            ),
+            ruler_evaluation_mode=self._validated_config(
+                "ruler-evaluation-mode", lambda v: v in RULER_EVALUATION_MODES
+            ),
+            ruler_evaluation_max_jitter=self._validated_config(
+                "ruler-evaluation-max-jitter", lambda v: v == "" or is_valid_duration(v)
+            ),
+            query_frontend_address=self._query_frontend_address,
+            otlp_index_labels=parse_otlp_attributes(
+                self._validated_config(
+                    "otlp-index-labels", lambda v: parse_otlp_attributes(v) is not None
+                )
+            ),
+            chunk_encoding=self._validated_config(
+                "chunk-encoding", lambda v: v in CHUNK_ENCODINGS
+            ),
+            chunk_target_size=self._validated_config("chunk-target-size", lambda v: v > 0),
+            chunk_idle_period=self._validated_config("chunk-idle-period", is_valid_duration),
+            max_chunk_age=self._validated_config("max-chunk-age", is_valid_duration),
+            concurrent_flushes=self._validated_config("concurrent-flushes", lambda v: v >= 0),
+            wal_checkpoint_duration=self._validated_config(
+                "wal-checkpoint-duration", is_valid_duration
+            ),
+            target=self._target_of(_unit_number(self.unit)),
+            memberlist_join_members=self._memberlist_join_members,
+            replication_factor=self._replication_factor,
+            compactor_address=self._compactor_address,
+            s3=s3,
+            object_storage_migration_date=(
+                self._object_storage_migration_date(tsdb_versions_migration_dates) if s3 else ""
+            ),
+            retention_streams=parse_retention_streams(
+                self._validated_config(
+                    "retention-streams", lambda v: parse_retention_streams(v) is not None
+                )
+            ),
+            compaction_interval=self._validated_config("compaction-interval", is_valid_duration),
+            retention_delete_worker_count=self._validated_config(
+                "retention-delete-worker-count", lambda v: v > 0
+            ),
+            multi_tenant=self._multi_tenant,
+            tenants=self._tenants,
+            tenant_limits=parse_tenant_limits(
+                self._validated_config(
+                    "tenant-limits", lambda v: parse_tenant_limits(v) is not None
+                )
+            ),
+            per_stream_rate_limit_mb=self._validated_config(
+                "per-stream-rate-limit-mb", lambda v: v >= 0
+            ),
+            per_stream_rate_limit_burst_mb=self._validated_config(
+                "per-stream-rate-limit-burst-mb", lambda v: v >= 0
+            ),
+            shard_streams=bool(self.config["shard-streams"]),
+            shard_streams_desired_rate=self._validated_config(
+                "shard-streams-desired-rate", is_valid_byte_size
+            ),
+            max_global_streams_per_user=self._validated_config(
+                "max-global-streams-per-user", lambda v: v >= 0
+            ),
+            max_label_names_per_series=self._validated_config(
+                "max-label-names-per-series", lambda v: v > 0
+            ),
+            max_line_size=self._validated_config("max-line-size", is_valid_byte_size),
+            max_line_size_truncate=bool(self.config["max-line-size-truncate"]),
+            reject_old_samples_max_age=self._validated_config(
+                "reject-old-samples-max-age", is_valid_duration
+            ),
+            creation_grace_period=self._validated_config(
+                "creation-grace-period", is_valid_duration
+            ),
+        )
+        if not config_builder.query_parallelism_fits_queue:
+            logger.error(
+                "The query parallelism does not fit the frontend queue of %s requests",
+                config_builder.max_outstanding_per_tenant,
+            )
+            self._invalid_config_options.extend(
+                ["max-query-parallelism", "tsdb-max-query-parallelism"]
+            )
+            config_builder.max_query_parallelism = config_builder.tsdb_max_query_parallelism = 0
+        config = config_builder.build()
+        runtime_config = config_builder.build_runtime_config()
 
         # Add a layer so we can check if the service is running
         self._loki_container.add_layer(self._name, self._loki_pebble_layer, combine=True)
 
+        if self._invalid_config_options:
+            self._stored.status["config"] = to_tuple(
+                BlockedStatus(f"Invalid config: {', '.join(self._invalid_config_options)}")
+            )
+
+        # Loki reloads the runtime config by itself, so changes to it do not require a restart.
+        # It is pushed first because Loki fails to start if the file is missing.
+        self._update_runtime_config(runtime_config)
+
+        # The alert rules files are laid out by tenant, which depends on the multi-tenant mode.
+        if (
+            self._stored.alert_rules_multi_tenant != self._multi_tenant
+            and self._ensure_alert_rules_path()
+        ):
+            self._regenerate_alert_rules()
+
+        restarted = False
         if self._update_config(config):
             self._loki_container.restart(self._name)
+            restarted = True
             logger.info("Loki restarted. There was a change to the configuration.")
 
         # Now that we for sure have a layer, we can check if the service is running
         elif not self._loki_container.get_service(self._service_name).is_running():
             self._loki_container.restart(self._name)
+            restarted = True
             logger.info("Loki restarted. The service was not in the active state.")
 
         # trigger replan to notice if it was the pebble layer itself that changed
         self._loki_container.replan()
 
-        if isinstance(to_status(self._stored.status["rules"]), BlockedStatus):
-
-            # If the status of this charm is blocked due to invalid rules in relation data,
-            # _check_alert_rules will set the status to Active just because the Loki API returned a 200, even though there are
-            # still errors in relation data.
-            # Thus, we will only call _check_alert_rules if there are no invalid alert rules in relation data.
-            if not self._has_alert_rule_errors():
-                # Wait briefly for Loki to come back up and re-check the alert rules
-                # in case an upgrade/refresh caused the check to occur when it wasn't
-                # ready yet. TODO: use custom pebble notice for "workload ready" event.
-                time.sleep(2)
-                self._check_alert_rules()
+        # A restarted Loki is not ready yet: the rules are verified when the ready check recovers,
+        # or on update-status once Loki is ready.
+        if restarted:
+            self._stored.alert_rules_unverified = True
+        else:
+            self._recheck_alert_rules()
 
         self.ingress_per_unit.provide_ingress_requirements(
             scheme="https" if self._tls_available else "http", port=self._port
         )
         self.metrics_provider.update_scrape_job_spec(self.scrape_jobs)
         self.grafana_source_provider.update_app_source(
-            app_datasource_url=self.ingress_per_unit.url or self._service_url
+            app_datasource_url=self._datasource_url
         )
-        self.loki_provider.update_endpoint(url=self._external_url)
+        self.loki_provider.update_endpoint(url=self._push_api_url)
         self.catalogue.update_item(item=self._catalogue_item)
 
+    def _configure_memcached(self, enabled: bool) -> Optional[str]:
+        """Start or stop the memcached sidecar.
+
+        Returns:
+            The address of memcached if Loki should use it as its chunks and results cache.
+        """
+        if not enabled and not self._stored.memcached_started:
+            return None
+
+        container = self._memcached_container
+        if not container.can_connect():
+            if enabled:
+                logger.debug("memcached is not ready yet; using the embedded cache meanwhile.")
+            return None
+
+        container.add_layer("memcached", self._memcached_pebble_layer(enabled), combine=True)
+        if not enabled:
+            container.stop("memcached")
+            self._stored.memcached_started = False
+            return None
+
+        container.replan()
+        self._stored.memcached_started = True
+        # Containers of the same pod share the network namespace. Memcached only listens on the
+        # IPv4 loopback address, which "localhost" may not resolve to.
+        return f"127.0.0.1:{MEMCACHED_PORT}"
+
+    def _validated_config(self, option: str, is_valid: Callable[[Any], bool]) -> Any:
+        """Return the value of a config option, or its default value if it is invalid.
+
+        Invalid options are collected so that they can be reported in the unit status.
+        """
+        value = self.config[option]
+        if is_valid(value):
+            return value
+        logger.error("Invalid value for config option %s: %s", option, value)
+        self._invalid_config_options.append(option)
+        return self.meta.config[option].default
+
     def _sorted_source_data(self) -> GrafanaSourceData:
         """From the `grafana-source` relation, pick the first Grafana instance in the sorted list for consistency.
 
@@ -707,13 +1264,34 @@ class LokiOperatorCharm(CharmBase):
         return nested_data[sorted(nested_data)[0]] if nested_data else GrafanaSourceData({}, None)
 
     def _update_config(self, config: dict) -> bool:
+        config_as_yaml = yaml.safe_dump(config)
+        digest = hashlib.sha256(config_as_yaml.encode()).hexdigest()
+        # Only pull the running config if the config changed since it was last pushed.
+        if digest == self._stored.config_digest:
+            return False
         if self._running_config() != config:
-            config_as_yaml = yaml.safe_dump(config)
             self._loki_container.push(LOKI_CONFIG, config_as_yaml, make_dirs=True)
             self._loki_container.push(LOKI_CONFIG_BACKUP, config_as_yaml, make_dirs=True)
+            self._backup_config_cache = None
+            self._stored.config_digest = digest
             logger.info("Pushed new configuration")
             return True
 
+        self._stored.config_digest = digest
+        return False
+
+    def _update_runtime_config(self, runtime_config: dict) -> bool:
+        runtime_config_as_yaml = yaml.safe_dump(runtime_config)
+        digest = hashlib.sha256(runtime_config_as_yaml.encode()).hexdigest()
+        if digest == self._stored.runtime_config_digest:
+            return False
+        if self._running_config(RUNTIME_CONFIG) != runtime_config:
+            self._loki_container.push(RUNTIME_CONFIG, runtime_config_as_yaml, make_dirs=True)
+            self._stored.runtime_config_digest = digest
+            logger.info("Pushed new runtime configuration")
+            return True
+
+        self._stored.runtime_config_digest = digest
         return False
 
     def _update_cert(self):
@@ -726,8 +1304,16 @@ class LokiOperatorCharm(CharmBase):
         if not self._loki_container.can_connect() or not self.resources_patch.is_ready():
             return
 
+        tls_config = self._tls_config
+        ca_certs = self._cert_transfer.get_all_certificates()
+        # Pushing the files and refreshing the trust stores is slow, and the certificates rarely change.
+        digest = self._cert_digest(tls_config, ca_certs)
         ca_cert_path = Path(self._ca_cert_path)
-        if tls_config := self._tls_config:
+        # The charm container may have been recreated, without the CA certificate.
+        if digest == self._stored.cert_digest and ca_cert_path.exists() == bool(tls_config):
+            return
+
+        if tls_config:
             # Save the workload certificates
             self._loki_container.push(
                 CERT_FILE,
@@ -760,7 +1346,6 @@ class LokiOperatorCharm(CharmBase):
 
         # Handle certificates received via the receive-ca-cert relation
         recv_ca_folder = Path(self._recv_ca_cert_folder_path)
-        ca_certs = self._cert_transfer.get_all_certificates()
 
         # Workload container: clean up and write current certs
         try:
@@ -783,6 +1368,17 @@ class LokiOperatorCharm(CharmBase):
 
         self._loki_container.exec(["update-ca-certificates", "--fresh"]).wait()
         subprocess.run(["update-ca-certificates", "--fresh"])
+        self._stored.cert_digest = digest
+
+    @staticmethod
+    def _cert_digest(tls_config: Optional[TLSConfig], ca_certs: Set[str]) -> str:
+        """Digest of the TLS material and the received CA certificates."""
+        material = []
+        if tls_config:
+            material += [tls_config.server_cert, tls_config.private_key, tls_config.ca_cert]
+        # The set of received CA certificates is unordered.
+        material += ["receive-ca-cert", *sorted(ca_certs)]
+        return hashlib.sha256("\0".join(material).encode()).hexdigest()
 
     def _alerting_config(self) -> str:
         """Construct Loki altering configuration.
@@ -800,14 +1396,30 @@ class LokiOperatorCharm(CharmBase):
 
         return ",".join(alertmanagers)
 
-    def _get_schema_config_version_migration_date_from_backup(self, sc_version: str) -> str:
-        """Get the 'from' date from the sc_version schema in Loki config.
+    def _get_schema_config_version_migration_date_from_backup(
+        self, sc_version: str, object_store: str = "filesystem"
+    ) -> str:
+        """Get the 'from' date from the sc_version schema, on the given object store, in Loki config.
 
         Returns:
             The 'from' date of the sc_version schema, in YYYY-MM-DD format (ISO 8601), if it is found; otherwise empty string.
         """
+        backup_config = self._backup_config()
+        for config in backup_config.get("schema_config", {}).get("configs", []):
+            if (
+                config.get("schema") == sc_version
+                and config.get("object_store", "filesystem") == object_store
+            ):
+                return config.get("from", "")
+        return ""
+
+    def _backup_config(self) -> Dict[str, Any]:
+        """Get the backup config, or {} if it is missing. It is only parsed once per dispatch."""
+        if self._backup_config_cache is not None:
+            return self._backup_config_cache
+
         try:
-            running_config = yaml.safe_load(
+            backup_config = yaml.safe_load(
                 self._loki_container.pull(LOKI_CONFIG_BACKUP, encoding="utf-8").read()
             )
         except PathError:
@@ -820,21 +1432,19 @@ class LokiOperatorCharm(CharmBase):
                     )
             except Error:
                 pass
-            return ""
+            backup_config = {}
         except yaml.YAMLError as e:
             raise ValueError("Error parsing Loki backup config.") from e
-        for config in running_config.get("schema_config", {}).get("configs", []):
-            if config.get("schema") == sc_version:
-                return config.get("from", "")
-        return ""
+        self._backup_config_cache = backup_config = backup_config or {}
+        return backup_config
 
-    def _running_config(self) -> Dict[str, Any]:
-        """Get the on-disk Loki config."""
+    def _running_config(self, path: str = LOKI_CONFIG) -> Dict[str, Any]:
+        """Get the on-disk Loki config, or runtime config."""
         if not self._loki_container.can_connect():
             return {}
 
         try:
-            return yaml.safe_load(self._loki_container.pull(LOKI_CONFIG, encoding="utf-8").read())
+            return yaml.safe_load(self._loki_container.pull(path, encoding="utf-8").read())
         except (FileNotFoundError, Error):
             return {}
 
@@ -864,16 +1474,14 @@ class LokiOperatorCharm(CharmBase):
         return False
 
     def _regenerate_alert_rules(self):
-        """Recreate all alert rules."""
-        self._remove_alert_rules_files()
-
-        alerts = self.loki_provider.alerts
-
-        # If there aren't any alerts, we can just clean it and move on
+        """Bring the alert rules files in line with the alert rules of the related charms."""
         # The alerts at this point are guaranteed to be valid,
         # since library filters out invalid rules before returning the dictionary.
+        alerts = self.loki_provider.alerts
+        self._sync_alert_rules_files(alerts)
+
+        # If there aren't any alerts, there is nothing to check.
         if alerts:
-            self._generate_alert_rules_files()
             self._check_alert_rules()
 
         # Check if any relations reported alert rule validation errors.
@@ -906,33 +1514,69 @@ class LokiOperatorCharm(CharmBase):
                     return True
         return False
 
-    def _generate_alert_rules_files(self) -> None:
-        """Generate and upload alert rules files.
+    def _sync_alert_rules_files(self, alerts: Dict[str, Any]) -> None:
+        """Push the alert rules files which changed, and remove the stale ones.
 
-        Args:
-            container: Container into which alert rules files are going to be uploaded
+        Only the files whose content changed are pushed, so that a relation change costs a
+        Pebble call per changed file, and the ruler only reloads the groups which changed.
         """
         file_mappings = {}
+        rule_count = 0
 
-        for identifier, alert_rules in self.loki_provider.alerts.items():
+        for identifier, alert_rules in alerts.items():
             rules = yaml.dump({"groups": alert_rules["groups"]})
-            file_mappings["{}_alert.rules".format(identifier)] = rules
-
-        if self._loki_container.can_connect():
-            for filename, content in file_mappings.items():
-                path = os.path.join(self.rules_dir_tenant, filename)
-                self._loki_container.push(path, content, make_dirs=True)
-        logger.debug("Saved alert rules to disk")
+            rule_count += sum(len(group.get("rules", [])) for group in alert_rules["groups"])
+            # The ruler evaluates the rules in a tenant directory against the logs of that tenant.
+            tenant = alert_rules.get("tenant_id", SINGLE_TENANT_ID)
+            file_mappings[os.path.join(tenant, f"{identifier}_alert.rules")] = rules
+        self._stored.rule_count = rule_count
 
-    def _remove_alert_rules_files(self) -> None:
-        """Remove alert rules files from workload container."""
         if not self._loki_container.can_connect():
-            logger.debug("Cannot connect to container to remove alert rule files!")
+            logger.debug("Cannot connect to container to sync alert rule files!")
             return
 
-        files = self._loki_container.list_files(self.rules_dir_tenant)
-        for f in files:
-            self._loki_container.remove_path(f.path)
+        tenant_dirs = [
+            tenant_dir
+            for tenant_dir in self._loki_container.list_files(RULES_DIR)
+            if tenant_dir.type == ops.pebble.FileType.DIRECTORY
+        ]
+        on_disk = {
+            os.path.relpath(f.path, RULES_DIR)
+            for tenant_dir in tenant_dirs
+            for f in self._loki_container.list_files(tenant_dir.path)
+        }
+        for filename in on_disk - file_mappings.keys():
+            self._loki_container.remove_path(os.path.join(RULES_DIR, filename))
+        # The directories of the tenants without rules, e.g. after the multi-tenant mode changed.
+        # The directory of the single tenant is kept for the rules API, see _ensure_alert_rules_path.
+        tenants = {os.path.dirname(filename) for filename in file_mappings}
+        for tenant_dir in tenant_dirs:
+            if tenant_dir.name not in tenants and tenant_dir.path != self.rules_dir_tenant:
+                self._loki_container.remove_path(tenant_dir.path, recursive=True)
+
+        # Files missing on disk, e.g. after the workload container was replaced, are pushed again.
+        pushed_digests = self._stored.alert_rules_digests
+        digests = {}
+        for filename, content in file_mappings.items():
+            digests[filename] = digest = hashlib.sha256(content.encode()).hexdigest()
+            if filename in on_disk and pushed_digests.get(filename) == digest:
+                continue
+            self._loki_container.push(os.path.join(RULES_DIR, filename), content, make_dirs=True)
+        self._stored.alert_rules_digests = digests
+        self._stored.alert_rules_multi_tenant = self._multi_tenant
+        logger.debug("Saved alert rules to disk")
+
+    @property
+    def _alert_rules_tenants(self) -> List[str]:
+        """Tenants with alert rules files, in multi-tenant mode."""
+        if not (self._multi_tenant and self._loki_container.can_connect()):
+            return []
+        return [
+            tenant_dir.name
+            for tenant_dir in self._loki_container.list_files(RULES_DIR)
+            if tenant_dir.type == ops.pebble.FileType.DIRECTORY
+            and self._loki_container.list_files(tenant_dir.path)
+        ]
 
     def _chunks_non_empty(self) -> bool:
         """Return True if Loki has written any log chunks to the filesystem.
@@ -962,17 +1606,116 @@ class LokiOperatorCharm(CharmBase):
     def _internal_url(self) -> str:
         """Return the fqdn dns-based in-cluster (private) address of the loki api server."""
         scheme = "https" if self._tls_available else "http"
-        return f"{scheme}://{socket.getfqdn()}:{self._port}"
+        return f"{scheme}://{self.hostname}:{self._port}"
+
+    def _wal_replay_status(self) -> Optional[StatusBase]:
+        """Return a maintenance status with the progress of the WAL replay, if one is ongoing.
+
+        After a restart, Loki rejects pushes until it replays its write-ahead log. The progress is
+        estimated from the bytes recovered so far, as reported by Loki's metrics, out of the size of
+        the WAL on disk. The metrics are only fetched while the ready check is down.
+        """
+        container = self._loki_container
+        if not container.can_connect() or not container.get_service(self._service_name).is_running():
+            return None
+        # Loki is not ready while it replays the WAL, so its metrics are not fetched on every hook.
+        ready_check = container.get_checks(READY_CHECK).get(READY_CHECK)
+        if not ready_check or ready_check.status != ops.pebble.CheckStatus.DOWN:
+            return None
+
+        ssl_context = ssl.create_default_context(
+            cafile=self._ca_cert_path if Path(self._ca_cert_path).exists() else None,
+        )
+        try:
+            with urllib.request.urlopen(
+                f"{self._internal_url}/metrics", timeout=2.0, context=ssl_context
+            ) as response:
+                metrics = response.read().decode("utf-8")
+        except Exception as e:
+            logger.debug("Could not fetch Loki metrics to check WAL replay: %s", e)
+            return None
+
+        if _metric_value(metrics, "loki_ingester_wal_replay_active") != 1:
+            return None
+
+        recovered = _metric_value(metrics, "loki_ingester_wal_recovered_bytes_total")
+        wal_size = self._wal_size()
+        if recovered is None or not wal_size:
+            return MaintenanceStatus("Replaying WAL")
+        # The WAL may keep growing during the replay, so never claim it is complete.
+        progress = min(99, int(100 * recovered / wal_size))
+        return MaintenanceStatus(f"Replaying WAL ({progress}%)")
+
+    def _chunks_size(self) -> int:
+        """Return the size in bytes of the log chunks on disk, or 0 if it cannot be determined.
+
+        The chunks of each tenant are in a directory named after the tenant, next to the WAL and
+        index directories.
+        """
+        try:
+            storage = self.model.storages["loki-chunks"][0]
+            return sum(
+                f.stat().st_size
+                for tenant_chunks_dir in Path(storage.location).iterdir()
+                if tenant_chunks_dir.is_dir() and tenant_chunks_dir.name not in ("wal", "index")
+                for f in tenant_chunks_dir.rglob("*")
+                if f.is_file()
+            )
+        except (IndexError, OSError):
+            return 0
+
+    def _wal_size(self) -> int:
+        """Return the size in bytes of the WAL on disk, or 0 if it cannot be determined.
+
+        Uses the charm-container mount point directly (via Juju storage) instead of the
+        Pebble API, like _chunks_non_empty.
+        """
+        try:
+            storage = self.model.storages["loki-chunks"][0]
+            wal_dir = Path(storage.location) / "wal"
+            return sum(f.stat().st_size for f in wal_dir.rglob("*") if f.is_file())
+        except (IndexError, OSError):
+            return 0
+
+    @property
+    def _loki_ready(self) -> bool:
+        """Whether the ready check of Loki passes."""
+        if not self._loki_container.can_connect():
+            return False
+        ready_check = self._loki_container.get_checks(READY_CHECK).get(READY_CHECK)
+        return bool(ready_check) and ready_check.status == ops.pebble.CheckStatus.UP
+
+    def _recheck_alert_rules(self):
+        """Check the alert rules again, if an earlier check failed or Loki restarted since."""
+        if self._stored.alert_rules_unverified or isinstance(
+            to_status(self._stored.status["rules"]), BlockedStatus
+        ):
+            # If the status of this charm is blocked due to invalid rules in relation data,
+            # _check_alert_rules will set the status to Active just because the Loki API returned a 200, even though there are
+            # still errors in relation data.
+            # Thus, we will only call _check_alert_rules if there are no invalid alert rules in relation data.
+            if not self._has_alert_rule_errors():
+                self._check_alert_rules()
 
     def _check_alert_rules(self):
         """Check alert rules using Loki API."""
+        self._stored.alert_rules_unverified = False
+        if not self._runs_ruler:
+            # The rules API is only served by the units running the ruler.
+            self._stored.status["rules"] = to_tuple(ActiveStatus())
+            return
         ssl_context = ssl.create_default_context(
             cafile=self._ca_cert_path if Path(self._ca_cert_path).exists() else None,
         )
         url = f"{self._internal_url}{self._loki_rules_endpoint}"
         try:
             logger.debug(f"Verifying alert rules via {url}.")
-            urllib.request.urlopen(url, timeout=2.0, context=ssl_context)
+            if not self._multi_tenant:
+                urllib.request.urlopen(url, timeout=2.0, context=ssl_context)
+            # In multi-tenant mode, the rules of each tenant are listed separately.
+            for tenant in self._alert_rules_tenants:
+                request = urllib.request.Request(url, headers={"X-Scope-OrgID": tenant})
+                urllib.request.urlopen(request, timeout=2.0, context=ssl_context)
         except HTTPError as e:
             msg = e.read().decode("utf-8")
 
@@ -1012,6 +1755,20 @@ class LokiOperatorCharm(CharmBase):
         requests = {"cpu": "0.25", "memory": "200Mi"}
         return adjust_resource_requirements(limits, requests, adhere_to_requests=True)
 
+    @property
+    def _resource_limits(self) -> Tuple[Optional[float], Optional[int]]:
+        """Return the effective cpu (in cores) and memory (in bytes) limits of the workload."""
+        try:
+            limits = self._resource_reqs_from_config().limits or {}
+        except ValueError:
+            return None, None
+        cpu = parse_quantity(limits.get("cpu"))
+        memory = parse_quantity(limits.get("memory"))
+        return (
+            float(cpu) if cpu is not None else None,
+            int(memory) if memory is not None else None,
+        )
+
     def _on_k8s_patch_failed(self, event: K8sResourcePatchFailedEvent):
         self._stored.status["k8s_patch"] = to_tuple(BlockedStatus(cast(str, event.message)))
 
@@ -1036,6 +1793,9 @@ class LokiOperatorCharm(CharmBase):
     def _charm_logging_endpoints(self) -> List[str]:
         """Loki endpoint for charm logging."""
         container = self._loki_container
+        # Charm logs carry no tenant ID, which Loki requires in multi-tenant mode.
+        if self._multi_tenant:
+            return []
         if container.can_connect() and container.get_service(self._name).is_running():
             scheme = "https" if self._charm_logging_ca_cert else "http"
             return [f"{scheme}://localhost:3100" + self._loki_push_api_endpoint]
@@ -1101,6 +1861,100 @@ class LokiOperatorCharm(CharmBase):
         ret.append({"version": "v13", "date": tomorrow.strftime(date_format)})
         return ret
 
+    def _object_storage_migration_date(
+        self, tsdb_versions_migration_dates: List[Dict[str, str]]
+    ) -> str:
+        """Date of the schema period from which the chunks are written to object storage.
+
+        Once rendered, the date is kept from the backup config. Otherwise, the period starts the
+        day after the latest schema period, and no earlier than tomorrow if Loki already stored
+        chunks, so that they remain readable.
+        """
+        if migration_date := self._get_schema_config_version_migration_date_from_backup(
+            "v13", object_store="s3"
+        ):
+            return migration_date
+
+        date_format = "%Y-%m-%d"
+        today = datetime.datetime.now(datetime.timezone.utc)
+        start = today + datetime.timedelta(days=1) if self._chunks_non_empty() else today
+        for migration in tsdb_versions_migration_dates:
+            if migration["date"]:
+                previous_date = datetime.datetime.strptime(migration["date"], date_format).replace(
+                    tzinfo=datetime.timezone.utc
+                )
+                start = max(start, previous_date + datetime.timedelta(days=1))
+        return start.strftime(date_format)
+
+    @property
+    def _s3_config(self) -> Optional[S3Config]:
+        """Object storage received over the `s3` relation, if the relation data is complete."""
+        relation = self.model.get_relation("s3")
+        if not relation or not relation.app:
+            return None
+        data = relation.data[relation.app]
+        if not all(data.get(key) for key in ("endpoint", "bucket", "access-key", "secret-key")):
+            return None
+        # Loki expects the endpoint without a scheme, and uses TLS unless told otherwise.
+        endpoint = data["endpoint"]
+        scheme, _, address = endpoint.rpartition("://")
+        return S3Config(
+            endpoint=address,
+            bucket=data["bucket"],
+            access_key=data["access-key"],
+            secret_key=data["secret-key"],
+            region=data.get("region", ""),
+            insecure=scheme == "http",
+            path_style=data.get("s3-uri-style") == "path",
+        )
+
+    def _request_bucket(self) -> None:
+        """Request a bucket over the `s3` relation, which the provider waits for to share one.
+
+        The s3-integrator charm uses the bucket in its own config if set, or else this one.
+        """
+        relation = self.model.get_relation("s3")
+        if not relation or not self.unit.is_leader():
+            return
+        if relation.data[self.app].get("bucket") != self.app.name:
+            relation.data[self.app]["bucket"] = self.app.name
+
+    @property
+    def _saved_s3_config(self) -> Optional[S3Config]:
+        """Object storage last received over the `s3` relation, if any."""
+        try:
+            secret = self.model.get_secret(label=S3_SECRET_LABEL)
+        except SecretNotFoundError:
+            return None
+        return S3Config(**json.loads(secret.get_content(refresh=True)["config"]))
+
+    def _save_s3_config(self, s3: S3Config) -> None:
+        """Keep the bucket settings, for when the `s3` relation data is unavailable."""
+        content = {"config": json.dumps(asdict(s3))}
+        try:
+            secret = self.model.get_secret(label=S3_SECRET_LABEL)
+        except SecretNotFoundError:
+            self.unit.add_secret(content, label=S3_SECRET_LABEL)
+            return
+        if secret.get_content(refresh=True) != content:
+            secret.set_content(content)
+
+    @property
+    def _remote_write_urls(self) -> List[str]:
+        """Remote-write endpoints received over the `send-remote-write` relations."""
+        urls = set()
+        for relation in self.model.relations["send-remote-write"]:
+            # Every unit of the remote application advertises its own endpoint.
+            for unit in relation.units:
+                try:
+                    url = json.loads(relation.data[unit].get("remote_write", "{}")).get("url")
+                except json.JSONDecodeError:
+                    logger.warning("Invalid remote_write data from %s", unit.name)
+                    continue
+                if url:
+                    urls.add(url)
+        return sorted(urls)
+
     def _update_datasource_exchange(self) -> None:
         """Update the grafana-datasource-exchange relations."""
         if not self.unit.is_leader():
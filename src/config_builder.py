@@ -5,12 +5,21 @@
 
 import datetime
 import os
-from typing import Dict, List, Optional
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import yaml
 
 # Paths in workload container
 HTTP_LISTEN_PORT = 3100
+GRPC_LISTEN_PORT = 9095
+MEMBERLIST_PORT = 7946
 LOKI_CONFIG_DIR = "/etc/loki"
 LOKI_CONFIG = os.path.join(LOKI_CONFIG_DIR, "loki-local-config.yaml")
+# Settings that Loki reloads periodically, without a restart.
+# Ref: https://grafana.com/docs/loki/latest/configure/#runtime-configuration-file
+RUNTIME_CONFIG = os.path.join(LOKI_CONFIG_DIR, "runtime-config.yaml")
 LOKI_CERTS_DIR = os.path.join(LOKI_CONFIG_DIR, "certs")
 
 CERT_FILE = os.path.join(LOKI_CERTS_DIR, "loki.cert.pem")
@@ -18,6 +27,7 @@ KEY_FILE = os.path.join(LOKI_CERTS_DIR, "loki.key.pem")
 
 LOKI_DIR = "/loki"
 CHUNKS_DIR = os.path.join(LOKI_DIR, "chunks")
+WAL_DIR = os.path.join(CHUNKS_DIR, "wal")
 
 # Path to a persisted config backup, for reference purposes.
 # Currently needed to migrate users between BoltDB-shipper and TSDB without needing a manual pre-upgrade action
@@ -31,6 +41,182 @@ BOLTDB_CACHE_DIR = os.path.join(LOKI_DIR, "boltdb-shipper-cache")
 TSDB_DIR = os.path.join(BOLTDB_DIR, "tsdb-index")
 TSDB_CACHE_DIR = os.path.join(LOKI_DIR, "tsdb-cache")
 RULES_DIR = os.path.join(LOKI_DIR, "rules")
+# Samples of the recording rules are buffered here until they are remote-written.
+RULER_WAL_DIR = os.path.join(LOKI_DIR, "ruler-wal")
+
+# When Loki runs in single-tenant mode (auth_enabled: false), everything belongs to the "fake" tenant.
+# https://grafana.com/docs/loki/latest/operations/multi-tenancy/
+SINGLE_TENANT_ID = "fake"
+
+MEMCACHED_PORT = 11211
+
+# Loki components a unit can run in the scalable mode, besides "all" of them.
+# Ref: https://grafana.com/docs/loki/latest/get-started/deployment-modes/#simple-scalable
+SCALABLE_TARGETS = ("write", "read", "backend")
+# Replication factor of the ingester ring, once there are enough write units for it: with 3
+# replicas, the write quorum of 2 survives the restart of a write unit.
+MAX_REPLICATION_FACTOR = 3
+
+# Per-tenant limits which can be set for individual tenants in multi-tenant mode.
+# Ref: https://grafana.com/docs/loki/latest/configure/#limits_config
+TENANT_LIMITS = (
+    "ingestion_rate_mb",
+    "ingestion_burst_size_mb",
+    "per_stream_rate_limit",
+    "per_stream_rate_limit_burst",
+    "max_global_streams_per_user",
+    "max_query_parallelism",
+    "tsdb_max_query_parallelism",
+    "max_queriers_per_tenant",
+    "max_entries_limit_per_query",
+    "max_query_series",
+    "max_query_length",
+    "max_query_lookback",
+    "query_timeout",
+    "max_streams_matchers_per_query",
+    "retention_period",
+)
+
+# Performance profiles
+PERFORMANCE_PROFILES = ("default", "auto")
+
+# Where the ruler runs the queries of the rules: on its own querier, or through the query frontend.
+# Ref: https://grafana.com/docs/loki/latest/operations/recording-rules/#remote-rule-evaluation
+RULER_EVALUATION_MODES = ("auto", "local", "remote")
+# Number of rules from which the opt-in "auto" mode evaluates them through the query frontend.
+# Switching the mode restarts Loki.
+REMOTE_EVALUATION_MIN_RULES = 100
+
+# Backends for the chunks and query results caches.
+CACHE_BACKENDS = ("embedded", "memcached")
+
+# How the memory reserved for the embedded caches is split between them.
+EMBEDDED_CACHE_SHARES = {
+    "chunks": 0.5,
+    "results": 0.3,
+    "index_stats": 0.1,
+    "volume": 0.1,
+}
+# Share of the memory limit used by the embedded caches with the "auto" performance profile.
+AUTO_EMBEDDED_CACHE_MEMORY_PERCENT = 15
+
+# Chunk compression algorithms supported by the ingester.
+# Ref: https://grafana.com/docs/loki/latest/configure/#ingester
+CHUNK_ENCODINGS = (
+    "snappy",
+    "lz4-64k",
+    "lz4-256k",
+    "lz4-1M",
+    "lz4",
+    "zstd",
+    "gzip",
+    "flate",
+    "none",
+)
+
+# Ref: https://prometheus.io/docs/prometheus/latest/configuration/configuration/#duration
+_DURATION_RE = re.compile(r"0|(\d+y)?(\d+w)?(\d+d)?(\d+h)?(\d+m)?(\d+s)?(\d+ms)?")
+_BYTE_SIZE_RE = re.compile(r"\d+(\.\d+)?\s*([KMGT]i?B|B)?", re.IGNORECASE)
+_OTLP_ATTRIBUTE_RE = re.compile(r"[A-Za-z_][\w.\-]*")
+_DURATION_UNITS = {"y": 365 * 86400, "w": 7 * 86400, "d": 86400, "h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+def is_valid_duration(value: str) -> bool:
+    """Check whether a string is a valid Prometheus-style duration, e.g. "1h30m"."""
+    return bool(value) and bool(_DURATION_RE.fullmatch(value))
+
+
+def is_valid_byte_size(value: str) -> bool:
+    """Check whether a string is a valid byte size for Loki, e.g. "1536KB" or "3MiB"."""
+    return bool(_BYTE_SIZE_RE.fullmatch(value))
+
+
+def _duration_seconds(value: str) -> float:
+    """Return the number of seconds in a valid Prometheus-style duration."""
+    seconds = 0.0
+    for number, unit in re.findall(r"(\d+)(ms|[ywdhms])", value):
+        seconds += int(number) * _DURATION_UNITS[unit]
+    return seconds
+
+
+def parse_otlp_attributes(value: str) -> Optional[List[str]]:
+    """Parse a comma-separated list of OTLP attribute names, or return None if it is invalid."""
+    attributes = [attribute.strip() for attribute in value.split(",") if attribute.strip()]
+    if not all(_OTLP_ATTRIBUTE_RE.fullmatch(attribute) for attribute in attributes):
+        return None
+    return attributes
+
+
+def v13_effective_today(tsdb_versions_migration_dates: List[Dict[str, str]]) -> bool:
+    """Check if v13 schema is the currently effective schema (from date <= today)."""
+    today = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+    for migration in tsdb_versions_migration_dates:
+        if migration["version"] == "v13" and migration["date"] and migration["date"] <= today:
+            return True
+    return False
+
+
+def parse_tenant_limits(value: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Parse a YAML mapping of tenant IDs to limits overrides, or return None if it is invalid.
+
+    Only the limits in TENANT_LIMITS can be overridden.
+    """
+    try:
+        tenant_limits = yaml.safe_load(value) or {}
+    except yaml.YAMLError:
+        return None
+    if not isinstance(tenant_limits, dict):
+        return None
+    for tenant, limits in tenant_limits.items():
+        if not isinstance(tenant, str) or not isinstance(limits, dict):
+            return None
+        if not set(limits) <= set(TENANT_LIMITS):
+            return None
+    return tenant_limits
+
+
+def parse_retention_streams(value: str) -> Optional[List[Dict[str, Any]]]:
+    """Parse a YAML list of per-stream retention rules, or return None if it is invalid.
+
+    Each rule has a LogQL stream "selector", a retention "period", and an optional "priority"
+    (default 1), which decides between rules matching the same stream.
+    Ref: https://grafana.com/docs/loki/latest/operations/storage/retention/#per-stream-retention
+    """
+    try:
+        rules = yaml.safe_load(value) or []
+    except yaml.YAMLError:
+        return None
+    if not isinstance(rules, list):
+        return None
+
+    retention_streams = []
+    for rule in rules:
+        if not isinstance(rule, dict) or set(rule) - {"selector", "period", "priority"}:
+            return None
+        selector, period = str(rule.get("selector", "")), str(rule.get("period", ""))
+        priority = rule.get("priority", 1)
+        if not (selector.startswith("{") and selector.endswith("}")):
+            return None
+        if not is_valid_duration(period) or not isinstance(priority, int):
+            return None
+        # Loki rejects retention periods shorter than the 24h index period.
+        if _duration_seconds(period) < 86400:
+            return None
+        retention_streams.append({"selector": selector, "priority": priority, "period": period})
+    return retention_streams
+
+
+@dataclass
+class S3Config:
+    """S3-compatible object storage received by the charm over the `s3` relation."""
+
+    endpoint: str
+    bucket: str
+    access_key: str
+    secret_key: str
+    region: str = ""
+    insecure: bool = False
+    path_style: bool = False
 
 
 class ConfigBuilder:
@@ -42,9 +228,6 @@ class ConfigBuilder:
     Reference: https://grafana.com/docs/loki/latest/configuration/
     """
 
-    _target: str = "all"
-    _auth_enabled: bool = False
-
     def __init__(
         self,
         *,
@@ -59,6 +242,59 @@ class ConfigBuilder:
         reporting_enabled: bool,
         grafana_external_url: Optional[str],
         datasource_uid: str,
+        performance_profile: str = "default",
+        cpu_limit: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        embedded_cache_memory_percent: int = 0,
+        embedded_cache_ttl: str = "1h",
+        memcached_address: Optional[str] = None,
+        query_split_interval: str = "0",
+        max_query_parallelism: int = 0,
+        tsdb_max_query_parallelism: int = 0,
+        query_sharding: bool = False,
+        chunk_encoding: str = "snappy",
+        chunk_target_size: int = 1572864,
+        chunk_idle_period: str = "1h",
+        max_chunk_age: str = "2h",
+        concurrent_flushes: int = 0,
+        wal_checkpoint_duration: str = "5m",
+        target: str = "all",
+        memberlist_join_members: Optional[List[str]] = None,
+        replication_factor: int = 1,
+        compactor_address: str = "",
+        s3: Optional[S3Config] = None,
+        object_storage_migration_date: str = "",
+        retention_streams: Optional[List[Dict[str, Any]]] = None,
+        compaction_interval: str = "10m",
+        retention_delete_worker_count: int = 150,
+        multi_tenant: bool = False,
+        tenants: Optional[List[str]] = None,
+        tenant_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        per_stream_rate_limit_mb: int = 0,
+        per_stream_rate_limit_burst_mb: int = 0,
+        shard_streams: bool = False,
+        shard_streams_desired_rate: str = "1536KB",
+        max_entries_limit_per_query: int = 0,
+        max_query_series: int = 0,
+        max_query_length: str = "",
+        max_query_lookback: str = "0",
+        query_timeout: str = "1m",
+        max_streams_matchers_per_query: int = 1000,
+        max_global_streams_per_user: int = 5000,
+        max_label_names_per_series: int = 15,
+        max_line_size: str = "256KB",
+        max_line_size_truncate: bool = False,
+        reject_old_samples_max_age: str = "1w",
+        creation_grace_period: str = "10m",
+        log_queries_longer_than: str = "0",
+        query_stats_enabled: bool = False,
+        remote_write_urls: Optional[List[str]] = None,
+        rule_count: int = 0,
+        ruler_evaluation_interval: str = "1m",
+        ruler_evaluation_mode: str = "local",
+        ruler_evaluation_max_jitter: str = "",
+        query_frontend_address: str = "",
+        otlp_index_labels: Optional[List[str]] = None,
     ):
         """Init method."""
         self.instance_addr = instance_addr
@@ -72,12 +308,86 @@ class ConfigBuilder:
         self.reporting_enabled = reporting_enabled
         self.grafana_external_url = grafana_external_url
         self.datasource_uid = datasource_uid
+        self.performance_profile = performance_profile
+        # Effective resource limits of the workload container (cores and bytes), if any.
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.embedded_cache_memory_percent = embedded_cache_memory_percent
+        self.embedded_cache_ttl = embedded_cache_ttl
+        self.memcached_address = memcached_address
+        self.query_split_interval = query_split_interval
+        # A parallelism of 0 means "derive from the querier concurrency".
+        self.max_query_parallelism = max_query_parallelism
+        self.tsdb_max_query_parallelism = tsdb_max_query_parallelism
+        self.query_sharding = query_sharding
+        self.chunk_encoding = chunk_encoding
+        self.chunk_target_size = chunk_target_size
+        self.chunk_idle_period = chunk_idle_period
+        self.max_chunk_age = max_chunk_age
+        # A concurrency of 0 means "derive from the cpu limit, or use Loki's default".
+        self.concurrent_flushes = concurrent_flushes
+        self.wal_checkpoint_duration = wal_checkpoint_duration
+        self.target = target
+        # Without members to join, the rings are kept in memory, which only works for a single unit.
+        self.memberlist_join_members = memberlist_join_members or []
+        self.replication_factor = replication_factor
+        self.compactor_address = compactor_address
+        self.s3 = s3
+        # Chunks are written to object storage from this date on, when object storage is available.
+        self.object_storage_migration_date = object_storage_migration_date
+        self.retention_streams = retention_streams or []
+        self.compaction_interval = compaction_interval
+        self.retention_delete_worker_count = retention_delete_worker_count
+        # In multi-tenant mode, pushes and queries must carry a tenant ID in the X-Scope-OrgID header.
+        self.multi_tenant = multi_tenant
+        self.tenants = tenants or []
+        self.tenant_limits = tenant_limits or {}
+        # A per-stream limit of 0 means "same as the per-tenant limit".
+        self.per_stream_rate_limit_mb = per_stream_rate_limit_mb or ingestion_rate_mb
+        self.per_stream_rate_limit_burst_mb = (
+            per_stream_rate_limit_burst_mb or ingestion_burst_size_mb
+        )
+        self.shard_streams = shard_streams
+        self.shard_streams_desired_rate = shard_streams_desired_rate
+        # Query guardrails; a limit of 0 (or "" for the query length) means "derive from the performance profile".
+        self.max_entries_limit_per_query = max_entries_limit_per_query
+        self.max_query_series = max_query_series
+        self.max_query_length = max_query_length
+        self.max_query_lookback = max_query_lookback
+        self.query_timeout = query_timeout
+        self.max_streams_matchers_per_query = max_streams_matchers_per_query
+        self.max_global_streams_per_user = max_global_streams_per_user
+        self.max_label_names_per_series = max_label_names_per_series
+        self.max_line_size = max_line_size
+        self.max_line_size_truncate = max_line_size_truncate
+        # A maximum age of "0" means "accept samples of any age".
+        self.reject_old_samples_max_age = reject_old_samples_max_age
+        self.creation_grace_period = creation_grace_period
+        # A duration of "0" means "do not log slow queries".
+        self.log_queries_longer_than = log_queries_longer_than
+        self.query_stats_enabled = query_stats_enabled
+        self.remote_write_urls = remote_write_urls or []
+        # Total number of rules to evaluate, across all tenants.
+        self.rule_count = rule_count
+        self.ruler_evaluation_interval = ruler_evaluation_interval
+        self.ruler_evaluation_mode = ruler_evaluation_mode
+        # An empty jitter means "derive from the evaluation interval and mode".
+        self.ruler_evaluation_max_jitter = ruler_evaluation_max_jitter
+        # gRPC address of the query frontend used for remote evaluation; defaults to this instance.
+        self.query_frontend_address = query_frontend_address or f"{instance_addr}:{GRPC_LISTEN_PORT}"
+        # OTLP resource attributes stored as index labels, instead of Loki's default ones.
+        self.otlp_index_labels = otlp_index_labels or []
 
     def build(self) -> dict:
-        """Build Loki config dictionary."""
+        """Build Loki config dictionary.
+
+        Changes to this config only take effect after a restart of Loki, unlike those to the runtime
+        config.
+        """
         loki_config = {
-            "target": self._target,
-            "auth_enabled": self._auth_enabled,
+            "target": self.target,
+            "auth_enabled": self.multi_tenant,
+            "runtime_config": self._runtime_config,
             "common": self._common,
             "ingester": self._ingester,
             "ruler": self._ruler,
@@ -92,18 +402,47 @@ class ConfigBuilder:
             "compactor": self._compactor,
         }
 
+        if self.memberlist_join_members:
+            loki_config["memberlist"] = self._memberlist
+
         # Overwrite the default only if reporting is not enabled
         if not self.reporting_enabled:
             loki_config["analytics"] = self._analytics
 
         return loki_config
 
+    def build_runtime_config(self) -> dict:
+        """Build Loki runtime config dictionary, with the per-tenant limits that Loki hot-reloads."""
+        if not self.multi_tenant:
+            return {"overrides": {SINGLE_TENANT_ID: self._tenant_limits}}
+
+        # Every tenant gets the configured limits, so that a tenant pushing too much only gets
+        # itself throttled, and then the limits set for it specifically. The logs pushed before
+        # the switch to multi-tenant mode stay in the single tenant, e.g. until they expire.
+        tenants = sorted({SINGLE_TENANT_ID, *self.tenants, *self.tenant_limits})
+        return {
+            "overrides": {
+                tenant: {**self._tenant_limits, **self.tenant_limits.get(tenant, {})}
+                for tenant in tenants
+            }
+        }
+
     @property
-    def _common(self) -> dict:
+    def _runtime_config(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#runtime_config
         return {
+            "file": RUNTIME_CONFIG,
+            # How often Loki checks the runtime config file for changes.
+            "period": "10s",
+        }
+
+    @property
+    def _common(self) -> dict:
+        kvstore = "memberlist" if self.memberlist_join_members else "inmemory"
+        common = {
             "path_prefix": LOKI_DIR,
-            "replication_factor": 1,
-            "ring": {"instance_addr": self.instance_addr, "kvstore": {"store": "inmemory"}},
+            "replication_factor": self.replication_factor,
+            "ring": {"instance_addr": self.instance_addr, "kvstore": {"store": kvstore}},
             "storage": {
                 "filesystem": {
                     "chunks_directory": CHUNKS_DIR,
@@ -111,16 +450,55 @@ class ConfigBuilder:
                 }
             },
         }
+        if self.compactor_address:
+            # Where the units which do not run the compactor send delete requests to.
+            common["compactor_address"] = self.compactor_address
+        return common
 
     @property
-    def _ingester(self) -> dict:
+    def _memberlist(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#memberlist
         return {
-            "wal": {
-                "dir": os.path.join(CHUNKS_DIR, "wal"),
-                "enabled": True,
-                "flush_on_shutdown": True,
-            }
+            "bind_port": MEMBERLIST_PORT,
+            "join_members": self.memberlist_join_members,
+        }
+
+    @property
+    def _ingester(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#ingester
+        ingester: Dict[str, Any] = {
+            "wal": self._wal,
+            "chunk_encoding": self.chunk_encoding,
+            # Target (compressed) size of a chunk; chunks are cut when reaching it.
+            "chunk_target_size": self.chunk_target_size,
+            # Chunks of streams that stop receiving logs are flushed after this period. Loki's default is 30m,
+            # which produces many small chunks on the filesystem for streams with a low log rate.
+            "chunk_idle_period": self.chunk_idle_period,
+            # Chunks are flushed when reaching this age, even if they did not reach the target size.
+            "max_chunk_age": self.max_chunk_age,
+        }
+        if self.concurrent_flushes:
+            ingester["concurrent_flushes"] = self.concurrent_flushes
+        elif cpu := self._tuning_cpu:
+            # How many flushes can happen concurrently from each stream. Default is 32.
+            ingester["concurrent_flushes"] = max(4, round(4 * cpu))
+        return ingester
+
+    @property
+    def _wal(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#ingester
+        wal: Dict[str, Any] = {
+            "dir": WAL_DIR,
+            "enabled": True,
+            "flush_on_shutdown": True,
+            # Frequent checkpoints keep the WAL segments to replay on restart short. Default is 5m.
+            "checkpoint_duration": self.wal_checkpoint_duration,
         }
+        if self.memory_limit:
+            # Above this, the replay flushes chunks to storage before continuing, rather than running out of
+            # memory. Loki's default (4GB) ignores the memory available; upstream recommends half of it.
+            wal["replay_memory_ceiling"] = f"{self.memory_limit // 2 // 2**20}MiB"
+        return wal
 
     @property
     def _ruler(self) -> dict:
@@ -129,11 +507,50 @@ class ConfigBuilder:
             "alertmanager_url": self.alertmanager_url,
             "enable_alertmanager_v2": True,
             "datasource_uid": self.datasource_uid,
+            "evaluation_interval": self.ruler_evaluation_interval,
+            "evaluation": self._ruler_evaluation,
         }
         if self.grafana_external_url:  # external_url has no default so we conditionally add it
             ruler_config.update({"external_url": self.grafana_external_url})
+        if self.remote_write_urls:
+            # Results of the recording rules are written to a WAL and pushed to Prometheus.
+            # Ref: https://grafana.com/docs/loki/latest/alert/#remote-write
+            ruler_config["wal"] = {"dir": RULER_WAL_DIR}
+            ruler_config["remote_write"] = {
+                "enabled": True,
+                "clients": {
+                    f"remote-write-{i}": {"url": url}
+                    for i, url in enumerate(self.remote_write_urls)
+                },
+            }
         return ruler_config
 
+    @property
+    def _ruler_evaluation(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#ruler
+        if not self._remote_rule_evaluation:
+            return {"mode": "local", "max_jitter": self.ruler_evaluation_max_jitter or "0s"}
+        return {
+            "mode": "remote",
+            # Spread the evaluations of the rule groups over the interval, rather than sending all of their queries
+            # to the frontend at once.
+            "max_jitter": self.ruler_evaluation_max_jitter
+            or f"{int(_duration_seconds(self.ruler_evaluation_interval) // 5)}s",
+            "query_frontend": {"address": f"dns:///{self.query_frontend_address}"},
+        }
+
+    @property
+    def _remote_rule_evaluation(self) -> bool:
+        """Whether the ruler runs the queries of the rules through the query frontend.
+
+        Rule groups are evaluated concurrently either way, but locally they all share the querier
+        of the ruler. Through the frontend, their queries are split, cached and spread over the
+        querier slots like any other query.
+        """
+        if self.ruler_evaluation_mode == "auto":
+            return self.rule_count >= REMOTE_EVALUATION_MIN_RULES
+        return self.ruler_evaluation_mode == "remote"
+
     @property
     def _schema_config(self) -> dict:
         configs = [
@@ -158,13 +575,29 @@ class ConfigBuilder:
                     }
                 )
 
+        if self._object_storage_enabled:
+            configs.append(
+                {
+                    "from": self.object_storage_migration_date,
+                    "index": {"period": "24h", "prefix": "index_"},
+                    "object_store": "s3",
+                    "schema": "v13",
+                    "store": "tsdb",
+                }
+            )
+
         return {"configs": configs}
 
+    @property
+    def _object_storage_enabled(self) -> bool:
+        return bool(self.s3 and self.object_storage_migration_date)
+
     @property
     def _server(self) -> dict:
         _server = {
             "http_listen_address": "0.0.0.0",
             "http_listen_port": HTTP_LISTEN_PORT,
+            "grpc_listen_port": GRPC_LISTEN_PORT,
         }
 
         if self.http_tls:
@@ -179,7 +612,7 @@ class ConfigBuilder:
     def _storage_config(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#storage_config
         # Note: shared_store was removed in Loki 3.0
-        return {
+        storage_config: Dict[str, Any] = {
             "boltdb_shipper": {
                 "active_index_directory": BOLTDB_DIR,
                 "cache_location": BOLTDB_CACHE_DIR,
@@ -188,48 +621,121 @@ class ConfigBuilder:
                 "active_index_directory": TSDB_DIR,
                 "cache_location": TSDB_CACHE_DIR,
             },
+            # The chunks of the periods before the object storage migration stay on the filesystem.
             "filesystem": {"directory": CHUNKS_DIR},
         }
+        if self.s3 and self._object_storage_enabled:
+            # Ref: https://grafana.com/docs/loki/latest/configure/#aws_storage_config
+            storage_config["aws"] = {
+                "endpoint": self.s3.endpoint,
+                "bucketnames": self.s3.bucket,
+                "access_key_id": self.s3.access_key,
+                "secret_access_key": self.s3.secret_key,
+                "region": self.s3.region,
+                "insecure": self.s3.insecure,
+                "s3forcepathstyle": self.s3.path_style,
+            }
+        return storage_config
 
     @property
     def _v13_effective_today(self) -> bool:
         """Check if v13 schema is the currently effective schema (from date <= today)."""
-        today = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
-        for migration in self.tsdb_versions_migration_dates:
-            if migration["version"] == "v13" and migration["date"] and migration["date"] <= today:
-                return True
-        return False
+        return v13_effective_today(self.tsdb_versions_migration_dates)
 
     @property
     def _limits_config(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#limits_config
-        return {
+        # Limits that may change often belong in _tenant_limits instead, so that changing them does not restart Loki.
+        limits_config = {
+            # Kept in the static config, as the "schema-migration" pebble check looks for it in the config file.
             "allow_structured_metadata": self._v13_effective_today,
+        }
+        if self.multi_tenant:
+            # The runtime config only overrides the limits of the tenants it lists. Tenants unknown to the charm, e.g.
+            # of clients pushing with their own X-Scope-OrgID, would otherwise get Loki's defaults, which keep the
+            # logs forever. Changing these limits then restarts Loki.
+            limits_config.update(self._tenant_limits)
+        return limits_config
+
+    @property
+    def _tenant_limits(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/configure/#limits_config
+        # These override the limits_config defaults and are reloaded from the runtime config without a restart.
+        return {
             # For convenience, we use an integer but Loki takes a float
             "ingestion_rate_mb": float(self.ingestion_rate_mb),
             "ingestion_burst_size_mb": float(self.ingestion_burst_size_mb),
-            # The per-stream limits are intentionally set to match the per-user limits, to simplify UX and address the
+            # Unless set otherwise, the per-stream limits match the per-user limits, to simplify UX and address the
             # case of one stream per user.
-            "per_stream_rate_limit": f"{self.ingestion_rate_mb}MB",
-            "per_stream_rate_limit_burst": f"{self.ingestion_burst_size_mb}MB",
-            # This charmed operator is intended for running a single loki instances, so we don't need to split queries
+            "per_stream_rate_limit": f"{self.per_stream_rate_limit_mb}MB",
+            "per_stream_rate_limit_burst": f"{self.per_stream_rate_limit_burst_mb}MB",
+            # Ref: https://grafana.com/docs/loki/latest/operations/automatic-stream-sharding/
+            "shard_streams": {
+                "enabled": self.shard_streams,
+                "desired_rate": self.shard_streams_desired_rate,
+            },
+            # Splitting is disabled by default ("0"): on a single Loki instance, splitting long queries into many
+            # small ones easily fills up the frontend queue.
             # https://community.grafana.com/t/too-many-outstanding-requests-on-loki-2-7-1/78249/9
-            "split_queries_by_interval": "0",
+            "split_queries_by_interval": self.query_split_interval,
+            # Maximum number of split (and sharded) queries of a single query scheduled in parallel.
+            "max_query_parallelism": self._max_query_parallelism,
+            "tsdb_max_query_parallelism": self._tsdb_max_query_parallelism,
+            # Guardrails against runaway label cardinality and oversized or mistimed log lines. Samples rejected by
+            # these limits are counted in loki_discarded_samples_total, by reason.
+            "max_global_streams_per_user": self.max_global_streams_per_user,
+            "max_label_names_per_series": self.max_label_names_per_series,
+            "max_line_size": self.max_line_size,
+            "max_line_size_truncate": self.max_line_size_truncate,
+            "reject_old_samples": self.reject_old_samples_max_age != "0",
+            "reject_old_samples_max_age": self.reject_old_samples_max_age,
+            "creation_grace_period": self.creation_grace_period,
+            # Guardrails keeping a single expensive query, e.g. from Grafana Explore, from starving ingestion.
+            "max_entries_limit_per_query": self._max_entries_limit_per_query,
+            "max_query_series": self._max_query_series,
+            "max_query_length": self._max_query_length,
+            "max_query_lookback": self.max_query_lookback,
+            "query_timeout": self.query_timeout,
+            "max_streams_matchers_per_query": self.max_streams_matchers_per_query,
             "retention_period": f"{self.retention_period}d",
+            "retention_stream": self.retention_streams,
+            **self._otlp_config,
+        }
+
+    @property
+    def _otlp_config(self) -> dict:
+        # Ref: https://grafana.com/docs/loki/latest/send-data/otel/#changing-the-default-mapping-of-otlp-to-loki-format
+        # OTLP attributes that are not index labels are stored as structured metadata, which needs the v13 schema.
+        if not (self.otlp_index_labels and self._v13_effective_today):
+            return {}
+        return {
+            "otlp_config": {
+                "resource_attributes": {
+                    "ignore_defaults": True,
+                    "attributes_config": [
+                        {"action": "index_label", "attributes": self.otlp_index_labels}
+                    ],
+                },
+            },
         }
 
     @property
     def _query_range(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#query_range
         return {
-            "parallelise_shardable_queries": False,
+            "parallelise_shardable_queries": self.query_sharding,
+            "cache_results": True,
             "results_cache": {
-                "cache": {
-                    "embedded_cache": {
-                        # https://community.grafana.com/t/too-many-outstanding-requests-on-loki-2-7-1/78249/11
-                        "enabled": True
-                    }
-                }
+                "cache": self._cache("results"),
+            },
+            # Grafana issues index stats and volume queries on every Explore and dashboard refresh.
+            "cache_index_stats_results": True,
+            "index_stats_results_cache": {
+                "cache": {"embedded_cache": self._embedded_cache("index_stats")},
+            },
+            "cache_volume_results": True,
+            "volume_results_cache": {
+                "cache": {"embedded_cache": self._embedded_cache("volume")},
             },
         }
 
@@ -237,46 +743,155 @@ class ConfigBuilder:
     def _chunk_store_config(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#chunk_store_config
         return {
-            "chunk_cache_config": {
-                "embedded_cache": {
-                    # https://community.grafana.com/t/too-many-outstanding-requests-on-loki-2-7-1/78249/11
-                    "enabled": True
-                }
-            }
+            "chunk_cache_config": self._cache("chunks"),
         }
 
+    def _cache(self, name: str) -> dict:
+        """Cache config backed by memcached, if available, or by the embedded cache."""
+        # Ref: https://grafana.com/docs/loki/latest/configure/#cache_config
+        if self.memcached_address:
+            return {
+                "memcached": {"batch_size": 256, "parallelism": 10},
+                "memcached_client": {"addresses": self.memcached_address, "timeout": "500ms"},
+            }
+        # https://community.grafana.com/t/too-many-outstanding-requests-on-loki-2-7-1/78249/11
+        return {"embedded_cache": self._embedded_cache(name)}
+
+    def _embedded_cache(self, name: str) -> dict:
+        """Embedded cache config, sized to its share of the cache memory, if known."""
+        # Ref: https://grafana.com/docs/loki/latest/configure/#cache_config
+        cache: Dict[str, Any] = {"enabled": True, "ttl": self.embedded_cache_ttl}
+        if cache_memory := self._embedded_cache_memory:
+            # Loki's default is 100MB per cache, regardless of the memory available.
+            share = EMBEDDED_CACHE_SHARES[name]
+            cache["max_size_mb"] = max(1, int(cache_memory * share / 2**20))
+        return cache
+
+    @property
+    def _embedded_cache_memory(self) -> Optional[int]:
+        """Total memory, in bytes, reserved for the embedded caches, if it can be derived."""
+        if not self.memory_limit:
+            return None
+        if self.embedded_cache_memory_percent:
+            return self.memory_limit * self.embedded_cache_memory_percent // 100
+        if memory := self._tuning_memory:
+            return memory * AUTO_EMBEDDED_CACHE_MEMORY_PERCENT // 100
+        return None
+
     @property
     def _frontend(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#frontend
         return {
             # Maximum number of outstanding requests per tenant per frontend; requests beyond this error with HTTP 429.
-            # Default is 2048, but 8cpu16gb can ingest ~3 times more, so set to 4x.
-            "max_outstanding_per_tenant": 8192,
+            "max_outstanding_per_tenant": self.max_outstanding_per_tenant,
             # Compress HTTP responses.
             "compress_responses": True,
+            # Log the LogQL queries slower than this, with their statistics, to find the expensive ones.
+            "log_queries_longer_than": self.log_queries_longer_than,
+            # Log the statistics (bytes and lines processed, time spent queueing, etc.) of every query.
+            "query_stats_enabled": self.query_stats_enabled,
         }
 
     @property
     def _querier(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#querier
-        return {
-            # The maximum number of concurrent queries allowed. Default is 10.
-            "max_concurrent": 20,
-        }
+        querier: Dict[str, Any] = {"max_concurrent": self.max_concurrent}
+        if self.multi_tenant:
+            # Allow querying several tenants at once, e.g. "tenant-a|tenant-b" from Grafana.
+            querier["multi_tenant_queries_enabled"] = True
+        return querier
+
+    @property
+    def _max_query_parallelism(self) -> int:
+        return self.max_query_parallelism or self.max_concurrent
+
+    @property
+    def _tsdb_max_query_parallelism(self) -> int:
+        # TSDB shards are smaller than BoltDB ones, so more of them can run in parallel.
+        return self.tsdb_max_query_parallelism or 4 * self.max_concurrent
+
+    @property
+    def _max_entries_limit_per_query(self) -> int:
+        if self.max_entries_limit_per_query:
+            return self.max_entries_limit_per_query
+        if memory := self._tuning_memory:
+            # Loki's default of 5000 suits 16GiB; Grafana asks for 1000 lines by default.
+            return max(1000, round(5000 * memory / 2**34))
+        return 5000
+
+    @property
+    def _max_query_series(self) -> int:
+        if self.max_query_series:
+            return self.max_query_series
+        if memory := self._tuning_memory:
+            # Loki's default of 500 suits 16GiB.
+            return max(100, round(500 * memory / 2**34))
+        return 500
+
+    @property
+    def _max_query_length(self) -> str:
+        if self.max_query_length:
+            return self.max_query_length
+        if cpu := self._tuning_cpu:
+            # Loki's default of 30 days (and an hour) suits 8 cores; smaller units get shorter ranges.
+            return f"{max(24, min(721, round(721 * cpu / 8)))}h"
+        return "721h"
+
+    @property
+    def query_parallelism_fits_queue(self) -> bool:
+        """Whether the frontend queue fits every querier slot running a query at full parallelism.
+
+        Otherwise, a few concurrent long-range queries fill up the queue and Loki rejects further
+        queries with "too many outstanding requests".
+        """
+        parallelism = max(self._max_query_parallelism, self._tsdb_max_query_parallelism)
+        return parallelism * self.max_concurrent <= self.max_outstanding_per_tenant
+
+    @property
+    def _tuning_cpu(self) -> Optional[float]:
+        """The cpu limit to derive settings from, if auto-tuning is enabled."""
+        return self.cpu_limit if self.performance_profile == "auto" else None
+
+    @property
+    def _tuning_memory(self) -> Optional[int]:
+        """The memory limit to derive settings from, if auto-tuning is enabled."""
+        return self.memory_limit if self.performance_profile == "auto" else None
+
+    @property
+    def max_concurrent(self) -> int:
+        """The maximum number of concurrent queries allowed in the querier."""
+        if cpu := self._tuning_cpu:
+            # Two queries per core keeps the cores busy without oversubscribing them.
+            return max(2, round(2 * cpu))
+        # Loki's default is 10, but 8cpu16gb can handle twice as many.
+        return 20
+
+    @property
+    def max_outstanding_per_tenant(self) -> int:
+        """The maximum number of queued requests per tenant in the query frontend."""
+        if cpu := self._tuning_cpu:
+            return max(1024, round(1024 * cpu))
+        # Default is 2048, but 8cpu16gb can ingest ~3 times more, so set to 4x.
+        return 8192
 
     @property
     def _compactor(self) -> dict:
         # Ref: https://grafana.com/docs/loki/latest/configure/#compactor
         # Note: shared_store was removed in Loki 3.0
-        retention_enabled = self.retention_period != 0
+        # Per-stream retention applies even when the global retention period is infinite.
+        retention_enabled = self.retention_period != 0 or bool(self.retention_streams)
         config = {
             # Activate custom retention. Default is False.
             "retention_enabled": retention_enabled,
             "working_directory": COMPACTOR_DIR,
+            # How often the index is compacted and retention applied. Loki's default is 10m.
+            "compaction_interval": self.compaction_interval,
+            # Number of goroutines deleting expired chunks. Loki's default is 150.
+            "retention_delete_worker_count": self.retention_delete_worker_count,
         }
         # delete_request_store must be explicitly set when retention is enabled (Loki 3.0+)
         if retention_enabled:
-            config["delete_request_store"] = "filesystem"
+            config["delete_request_store"] = "s3" if self._object_storage_enabled else "filesystem"
         return config
 
     @property
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+"""Minimal client for the S3-compatible object storage of the Loki chunks."""
+
+import datetime
+import hashlib
+import hmac
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import requests
+
+from config_builder import S3Config
+
+_S3_NAMESPACE = {"s3": "http://s3.amazonaws.com/doc/2006-03-01/"}
+# Requests carry no payload, so the hash of the empty string is signed.
+_EMPTY_PAYLOAD_HASH = hashlib.sha256(b"").hexdigest()
+
+
+def _sign(
+    s3: S3Config, host: str, path: str, query: str, now: datetime.datetime
+) -> Dict[str, str]:
+    """Return the headers authenticating a GET request with AWS Signature Version 4.
+
+    Ref: https://docs.aws.amazon.com/AmazonS3/latest/API/sig-v4-header-based-auth.html
+    """
+    region = s3.region or "us-east-1"
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = now.strftime("%Y%m%d")
+    signed_headers = "host;x-amz-content-sha256;x-amz-date"
+    canonical_request = "\n".join(
+        [
+            "GET",
+            path,
+            query,
+            f"host:{host}\nx-amz-content-sha256:{_EMPTY_PAYLOAD_HASH}\nx-amz-date:{amz_date}\n",
+            signed_headers,
+            _EMPTY_PAYLOAD_HASH,
+        ]
+    )
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+    key = f"AWS4{s3.secret_key}".encode()
+    for part in (date, region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    return {
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": _EMPTY_PAYLOAD_HASH,
+        "Authorization": f"AWS4-HMAC-SHA256 Credential={s3.access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}",
+    }
+
+
+def bucket_usage(s3: S3Config, timeout: float = 10) -> Tuple[int, int]:
+    """Return the number of objects in the bucket, and their total size in bytes.
+
+    Raises:
+        requests.RequestException: if the bucket cannot be listed.
+        ElementTree.ParseError: if the listing is not valid XML, e.g. the error page of a proxy.
+    """
+    scheme = "http" if s3.insecure else "https"
+    if s3.path_style:
+        host, path = s3.endpoint, f"/{quote(s3.bucket)}"
+    else:
+        host, path = f"{s3.bucket}.{s3.endpoint}", "/"
+
+    objects = size = 0
+    continuation_token: Optional[str] = None
+    while True:
+        params = {"list-type": "2"}
+        if continuation_token:
+            params["continuation-token"] = continuation_token
+        # The query string is signed, so it is encoded here rather than by requests.
+        query = "&".join(
+            f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for key, value in sorted(params.items())
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+        response = requests.get(
+            f"{scheme}://{host}{path}?{query}",
+            headers=_sign(s3, host, path, query, now),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+
+        result = ElementTree.fromstring(response.content)
+        for content in result.findall("s3:Contents", _S3_NAMESPACE):
+            objects += 1
+            size += int(content.findtext("s3:Size", "0", _S3_NAMESPACE))
+        continuation_token = result.findtext("s3:NextContinuationToken", None, _S3_NAMESPACE)
+        truncated = result.findtext("s3:IsTruncated", "false", _S3_NAMESPACE) == "true"
+        if not (truncated and continuation_token):
+            return objects, size
@@ -96,6 +96,19 @@ def loki_config(juju: jubilant.Juju, app_name: str) -> dict:
         return {}
 
 
+def loki_runtime_config(juju: jubilant.Juju, app_name: str) -> dict:
+    """Fetch the Loki runtime configuration (per-tenant overrides) from loki HTTP api."""
+    address = get_unit_address(juju, app_name, 0)
+    url = f"http://{address}:3100/runtime_config"
+    try:
+        response = requests.get(url)
+        if response.status_code == 200:
+            return yaml.safe_load(response.text)
+        return {}
+    except requests.exceptions.RequestException:
+        return {}
+
+
 def loki_endpoint_request(
     juju: jubilant.Juju, app_name: str, endpoint: str, unit_num: int = 0
 ) -> str:
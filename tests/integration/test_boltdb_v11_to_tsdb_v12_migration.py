@@ -29,6 +29,7 @@ LOKI_UPGRADED = "loki-v11-v12-v13"
 resources = {
     "loki-image": METADATA["resources"]["loki-image"]["upstream-source"],
     "node-exporter-image": METADATA["resources"]["node-exporter-image"]["upstream-source"],
+    "memcached-image": METADATA["resources"]["memcached-image"]["upstream-source"],
 }
 
 
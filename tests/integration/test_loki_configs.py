@@ -7,7 +7,7 @@ from pathlib import Path
 
 import jubilant
 import yaml
-from helpers import is_loki_up, loki_config, loki_services
+from helpers import is_loki_up, loki_config, loki_runtime_config, loki_services
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +33,7 @@ def test_retention_configs(juju: jubilant.Juju):
     default_configs = loki_config(juju, app_name)
     assert all(
         [
-            default_configs["limits_config"]["retention_period"] == "0s",
+            loki_runtime_config(juju, app_name)["overrides"]["fake"]["retention_period"] == "0s",
             not default_configs["compactor"]["retention_enabled"],
         ]
     )
@@ -47,7 +47,7 @@ def test_retention_configs(juju: jubilant.Juju):
     configs_with_retention = loki_config(juju, app_name)
     assert all(
         [
-            configs_with_retention["limits_config"]["retention_period"] == "3d",
+            loki_runtime_config(juju, app_name)["overrides"]["fake"]["retention_period"] == "3d",
             configs_with_retention["compactor"]["retention_enabled"],
         ]
     )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import logging
+from pathlib import Path
+
+import jubilant
+import yaml
+from helpers import get_unit_address, is_loki_up, loki_config
+from minio import Minio
+
+logger = logging.getLogger(__name__)
+
+METADATA = yaml.safe_load(Path("./charmcraft.yaml").read_text())
+app_name = "loki"
+MINIO_USER = "accesskey"
+MINIO_PASS = "secretkey"
+MINIO_BUCKET = "loki"
+
+
+def test_setup_env(juju: jubilant.Juju):
+    juju.model_config({"logging-config": "<root>=WARNING; unit=DEBUG"})
+
+
+def test_object_storage_from_s3_relation(juju: jubilant.Juju, loki_charm, loki_resources):
+    # Set up minio and s3-integrator
+    juju.deploy(
+        "minio",
+        "minio-loki",
+        channel="edge",
+        trust=True,
+        config={"access-key": MINIO_USER, "secret-key": MINIO_PASS},
+    )
+    juju.deploy("s3-integrator", "s3-loki", channel="edge")
+    juju.wait(
+        lambda status: (
+            jubilant.all_active(status, "minio-loki")
+            and jubilant.all_agents_idle(status, "minio-loki")
+        ),
+        timeout=30 * 60,
+    )
+
+    minio_addr = get_unit_address(juju, "minio-loki", 0)
+    mc_client = Minio(
+        f"{minio_addr}:9000", access_key=MINIO_USER, secret_key=MINIO_PASS, secure=False
+    )
+    if not mc_client.bucket_exists(MINIO_BUCKET):
+        mc_client.make_bucket(MINIO_BUCKET)
+
+    juju.config("s3-loki", {"endpoint": f"http://{minio_addr}:9000", "bucket": MINIO_BUCKET})
+    result = juju.run(
+        "s3-loki/0", "sync-s3-credentials", {"access-key": MINIO_USER, "secret-key": MINIO_PASS}
+    )
+    assert result.success
+
+    juju.deploy(loki_charm, app_name, resources=loki_resources, trust=True)
+    juju.integrate(f"{app_name}:s3", "s3-loki")
+    juju.wait(
+        lambda status: (
+            jubilant.all_active(status, app_name, "s3-loki")
+            and jubilant.all_agents_idle(status, app_name, "s3-loki")
+        ),
+        timeout=15 * 60,
+    )
+    assert is_loki_up(juju, app_name)
+
+    # The chunks are written to the bucket from a new schema period
+    config = loki_config(juju, app_name)
+    assert config["schema_config"]["configs"][-1]["object_store"] == "s3"
+    assert config["storage_config"]["aws"]["bucketnames"] == MINIO_BUCKET
+
+
+def test_storage_usage_action(juju: jubilant.Juju):
+    result = juju.run(f"{app_name}/0", "storage-usage")
+    assert result.success
+    assert {"local-chunks-bytes", "local-wal-bytes", "s3-objects", "s3-bytes"} <= set(
+        result.results
+    )
@@ -23,6 +23,7 @@ TEMPO_APP_NAME = "tempo"
 loki_resources = {
     "loki-image": METADATA["resources"]["loki-image"]["upstream-source"],
     "node-exporter-image": METADATA["resources"]["node-exporter-image"]["upstream-source"],
+    "memcached-image": METADATA["resources"]["memcached-image"]["upstream-source"],
 }
 
 
@@ -3,11 +3,13 @@ from unittest.mock import PropertyMock, patch
 
 import ops
 import pytest
+import yaml
 from cosl.loki_logger import LokiHandler
-from ops.testing import Context
+from ops.testing import Context, State
 from scenario import Container, Exec
 
 from charm import LokiOperatorCharm
+from config_builder import LOKI_CONFIG, RUNTIME_CONFIG
 
 
 def tautology(*_, **__) -> bool:
@@ -56,3 +58,35 @@ def loki_container():
         layers={"loki": ops.pebble.Layer({"services": {"loki": {}}})},
         service_statuses={"loki": ops.pebble.ServiceStatus.INACTIVE},
     )
+
+
+@pytest.fixture
+def rendered_config(context, loki_container):
+    """Run config-changed with the given charm config, and return what Loki was configured with.
+
+    The returned callable takes the charm config, extra containers and any other `State` field,
+    and returns the output state, the Loki config and the runtime config.
+    """
+
+    def render(config=None, containers=(), **kwargs):
+        state = State(
+            leader=True, config=config or {}, containers=[loki_container, *containers], **kwargs
+        )
+        out = context.run(context.on.config_changed(), state)
+        fs = out.get_container("loki").get_filesystem(context)
+        loki_config = yaml.safe_load((fs / LOKI_CONFIG.lstrip("/")).read_text())
+        runtime_config = yaml.safe_load((fs / RUNTIME_CONFIG.lstrip("/")).read_text())
+        return out, loki_config, runtime_config
+
+    return render
+
+
+@pytest.fixture
+def rendered_runtime_limits(rendered_config):
+    """Like `rendered_config`, but return the output state and the limits of the single tenant."""
+
+    def render(config=None, **kwargs):
+        out, _, runtime_config = rendered_config(config, **kwargs)
+        return out, runtime_config["overrides"]["fake"]
+
+    return render
@@ -0,0 +1,86 @@
+import dataclasses
+from unittest.mock import PropertyMock, patch
+
+import ops
+from charms.loki_k8s.v1.loki_push_api import LokiPushApiProvider
+from ops.testing import Mount, State
+
+from charm import LokiOperatorCharm
+from config_builder import RULES_DIR
+
+
+def _alerts(*names: str, changed: str = ""):
+    return {
+        f"model_uuid_{name}": {
+            "groups": [
+                {
+                    "name": name,
+                    "rules": [{"alert": f"{name}{'Changed' if name == changed else ''}"}],
+                }
+            ]
+        }
+        for name in names
+    }
+
+
+def _sync(context, state: State, alerts):
+    """Sync the alert rules files, and return the output state with the files pushed and removed."""
+    with (
+        patch.object(LokiPushApiProvider, "alerts", new_callable=PropertyMock) as mock_alerts,
+        patch.object(LokiOperatorCharm, "_check_alert_rules"),
+        patch.object(ops.Container, "push", autospec=True, side_effect=ops.Container.push) as push,
+        patch.object(
+            ops.Container, "remove_path", autospec=True, side_effect=ops.Container.remove_path
+        ) as remove_path,
+    ):
+        mock_alerts.return_value = alerts
+        with context(context.on.update_status(), state) as mgr:
+            mgr.charm._regenerate_alert_rules()
+            out = mgr.run()
+    return out, _rules_calls(push), _rules_calls(remove_path)
+
+
+def _rules_calls(mock) -> int:
+    return sum(str(call.args[1]).startswith(RULES_DIR) for call in mock.call_args_list)
+
+
+def test_only_changed_alert_rules_files_are_written(context, loki_container, tmp_path):
+    # GIVEN the alert rules of 10 applications written to the rules directory
+    (tmp_path / "fake").mkdir()
+    container = dataclasses.replace(
+        loki_container, mounts={"rules": Mount(location=RULES_DIR, source=tmp_path)}
+    )
+    apps = [f"app{i}" for i in range(10)]
+    state, pushes, removals = _sync(context, State(containers=[container]), _alerts(*apps))
+    assert (pushes, removals) == (10, 0)
+
+    # WHEN one application changes its rules, one leaves and another joins
+    alerts = _alerts(*apps[1:], "app10", changed="app5")
+    state, pushes, removals = _sync(context, state, alerts)
+
+    # THEN only the changed files are written
+    assert (pushes, removals) == (2, 1)
+    files = sorted(p.name for p in (tmp_path / "fake").iterdir())
+    assert files == sorted(f"model_uuid_{app}_alert.rules" for app in apps[1:] + ["app10"])
+    assert "app5Changed" in (tmp_path / "fake" / "model_uuid_app5_alert.rules").read_text()
+
+    # AND nothing is written when the rules are unchanged
+    _, pushes, removals = _sync(context, state, alerts)
+    assert (pushes, removals) == (0, 0)
+
+
+def test_missing_alert_rules_files_are_written_again(context, loki_container, tmp_path):
+    # GIVEN alert rules written to a workload container which is then replaced
+    (tmp_path / "fake").mkdir()
+    container = dataclasses.replace(
+        loki_container, mounts={"rules": Mount(location=RULES_DIR, source=tmp_path)}
+    )
+    state, _, _ = _sync(context, State(containers=[container]), _alerts("app0", "app1"))
+    (tmp_path / "fake" / "model_uuid_app0_alert.rules").unlink()
+
+    # WHEN the alert rules are synced again
+    _, pushes, removals = _sync(context, state, _alerts("app0", "app1"))
+
+    # THEN the missing file is written again
+    assert (pushes, removals) == (1, 0)
+    assert (tmp_path / "fake" / "model_uuid_app0_alert.rules").exists()
@@ -0,0 +1,95 @@
+import dataclasses
+import json
+from unittest.mock import PropertyMock, patch
+
+from ops.testing import Relation, State
+
+from charm import LokiOperatorCharm, TLSConfig
+
+
+def _ca_cert_relation(*certs: str) -> Relation:
+    return Relation(
+        "receive-ca-cert",
+        local_app_data={"version": "1"},
+        remote_app_data={"certificates": json.dumps(list(certs))},
+    )
+
+
+def _run(context, event, state: State):
+    """Run an event, and return the output state with the number of trust store refreshes."""
+    with patch("charm.subprocess.run") as update_ca_certificates, patch.object(
+        LokiOperatorCharm, "_check_alert_rules"
+    ):
+        out = context.run(event, state)
+    workload_refreshes = [
+        process
+        for process in context.exec_history.get("loki", [])
+        if process.command == ["update-ca-certificates", "--fresh"]
+    ]
+    context.exec_history.clear()
+    return out, update_ca_certificates.call_count, len(workload_refreshes)
+
+
+def test_unchanged_certificates_are_not_rewritten(context, loki_container):
+    # GIVEN a CA certificate received over the receive-ca-cert relation
+    state = State(leader=True, containers=[loki_container], relations=[_ca_cert_relation("CA-1")])
+
+    # WHEN the first hook writes it
+    out, charm_refreshes, workload_refreshes = _run(context, context.on.update_status(), state)
+    assert (charm_refreshes, workload_refreshes) == (1, 1)
+
+    # THEN later hooks skip both trust store refreshes
+    _, charm_refreshes, workload_refreshes = _run(context, context.on.update_status(), out)
+    assert (charm_refreshes, workload_refreshes) == (0, 0)
+
+
+def test_changed_certificates_are_rewritten(context, loki_container):
+    # GIVEN certificates already written
+    state = State(leader=True, containers=[loki_container], relations=[_ca_cert_relation("CA-1")])
+    out, _, _ = _run(context, context.on.update_status(), state)
+
+    # WHEN another CA certificate is received
+    relation = out.get_relations("receive-ca-cert")[0]
+    certificates = json.dumps(["CA-1", "CA-2"])
+    state = dataclasses.replace(
+        out, relations=[dataclasses.replace(relation, remote_app_data={"certificates": certificates})]
+    )
+    out, charm_refreshes, workload_refreshes = _run(context, context.on.update_status(), state)
+
+    # THEN the trust stores are refreshed
+    assert (charm_refreshes, workload_refreshes) == (1, 1)
+    fs = out.get_container("loki").get_filesystem(context)
+    assert len(list((fs / "usr/local/share/ca-certificates/juju_receive-ca-cert").iterdir())) == 2
+
+
+def test_certificates_are_rewritten_on_pebble_ready(context, loki_container):
+    # GIVEN certificates already written
+    state = State(leader=True, containers=[loki_container], relations=[_ca_cert_relation("CA-1")])
+    out, _, _ = _run(context, context.on.update_status(), state)
+
+    # WHEN the workload container restarts, possibly with a fresh filesystem
+    _, charm_refreshes, workload_refreshes = _run(
+        context, context.on.pebble_ready(out.get_container("loki")), out
+    )
+
+    # THEN the certificates are written again
+    assert (charm_refreshes, workload_refreshes) == (1, 1)
+
+
+def test_missing_charm_ca_certificate_is_rewritten(context, loki_container, tmp_path):
+    # GIVEN a CA certificate written to the charm container
+    ca_cert_path = tmp_path / "cos-ca.crt"
+    state = State(leader=True, containers=[loki_container])
+    with patch.object(LokiOperatorCharm, "_ca_cert_path", str(ca_cert_path)), patch.object(
+        LokiOperatorCharm, "_tls_config", new_callable=PropertyMock
+    ) as tls_config:
+        tls_config.return_value = TLSConfig("CERT", "CA", "KEY")
+        out, _, _ = _run(context, context.on.update_status(), state)
+        assert ca_cert_path.read_text() == "CA"
+
+        # WHEN the charm container is recreated without it
+        ca_cert_path.unlink()
+        _run(context, context.on.update_status(), out)
+
+    # THEN it is written again
+    assert ca_cert_path.read_text() == "CA"
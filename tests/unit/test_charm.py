@@ -15,10 +15,10 @@ import pytest
 import yaml
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus
 from ops.testing import Context
-from scenario import Container, Exec, Relation, State
+from scenario import CheckInfo, Container, Exec, Relation, State
 
 from charm import LOKI_CONFIG as LOKI_CONFIG_PATH
-from charm import LokiOperatorCharm
+from charm import READY_CHECK, LokiOperatorCharm
 
 METADATA = {
     "model": "consumer-model",
@@ -491,10 +491,66 @@ def test_loki_connection_errors_on_lifecycle_events_appropriately_clear(ctx, lok
         assert isinstance(state_error.unit_status, BlockedStatus)
         assert "Failed to verify alert rules via" in state_error.unit_status.message
 
-        # Second call: success
+        # Second call: success, once the restarted Loki reports ready
         mock_request.side_effect = None
         mock_request.return_value = BytesIO(initial_bytes="success".encode())
 
-        state_success = ctx.run(ctx.on.config_changed(), state_error)
+        state_restarted = ctx.run(ctx.on.config_changed(), state_error)
+        ready_check = CheckInfo(READY_CHECK, level=ops.pebble.CheckLevel.READY, threshold=1)
+        container = replace(state_restarted.get_container("loki"), check_infos={ready_check})
+        state_success = ctx.run(
+            ctx.on.pebble_check_recovered(container, info=ready_check),
+            replace(state_restarted, containers={container}),
+        )
 
         assert state_success.unit_status == ActiveStatus()
+
+
+# --- TestChunkLifecycle ---
+
+
+@pytest.mark.parametrize(
+    "config, expected",
+    [
+        (
+            {},
+            {
+                "chunk_encoding": "snappy",
+                "chunk_target_size": 1572864,
+                "chunk_idle_period": "1h",
+                "max_chunk_age": "2h",
+            },
+        ),
+        (
+            {
+                "chunk-encoding": "zstd",
+                "chunk-target-size": 3145728,
+                "chunk-idle-period": "2h",
+                "max-chunk-age": "4h",
+                "concurrent-flushes": 8,
+            },
+            {
+                "chunk_encoding": "zstd",
+                "chunk_target_size": 3145728,
+                "chunk_idle_period": "2h",
+                "max_chunk_age": "4h",
+                "concurrent_flushes": 8,
+            },
+        ),
+        ({"chunk-encoding": "lz4-256k"}, {"chunk_encoding": "lz4-256k"}),
+        # Invalid values fall back to the defaults
+        ({"chunk-encoding": "brotli"}, {"chunk_encoding": "snappy"}),
+        ({"chunk-idle-period": "soon"}, {"chunk_idle_period": "1h"}),
+        ({"chunk-target-size": 0}, {"chunk_target_size": 1572864}),
+    ],
+)
+def test_chunk_lifecycle_is_rendered(ctx, loki_container, config, expected):
+    """Scenario: the chunk lifecycle config options are rendered into the ingester config."""
+    state = State(leader=True, config=config, containers=[loki_container])
+
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        state_out = ctx.run(ctx.on.config_changed(), state)
+
+    fs = state_out.get_container("loki").get_filesystem(ctx)
+    ingester = yaml.safe_load((fs / LOKI_CONFIG_PATH.lstrip("/")).read_text())["ingester"]
+    assert {key: ingester.get(key) for key in expected} == expected
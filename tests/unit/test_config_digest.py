@@ -0,0 +1,93 @@
+import dataclasses
+from unittest.mock import patch
+
+import ops
+import pytest
+import yaml
+from ops.testing import Container, Exec, Mount, State, pebble
+
+from charm import LokiOperatorCharm
+from config_builder import LOKI_CONFIG, LOKI_CONFIG_BACKUP, RUNTIME_CONFIG
+
+
+@pytest.fixture
+def loki_container(tmp_path):
+    # The config files persist across runs, like in the workload container.
+    return Container(
+        name="loki",
+        can_connect=True,
+        layers={"loki": pebble.Layer({"services": {"loki": {"startup": "enabled"}}})},
+        service_statuses={"loki": ops.pebble.ServiceStatus.ACTIVE},
+        execs={
+            Exec(["update-ca-certificates", "--fresh"], return_code=0),
+            Exec(["/usr/bin/loki", "-version"], return_code=0, stdout="loki, version 3.14159"),
+        },
+        mounts={
+            "config": Mount(location="/etc/loki", source=tmp_path / "config"),
+            "chunks": Mount(location="/loki/chunks", source=tmp_path / "chunks"),
+        },
+    )
+
+
+@pytest.fixture(autouse=True)
+def mount_sources(tmp_path):
+    (tmp_path / "config").mkdir()
+    (tmp_path / "chunks").mkdir()
+
+
+def _run(context, event, state: State):
+    """Run an event, and return the output state with the paths pulled from the workload."""
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch.object(
+        ops.Container, "pull", autospec=True, side_effect=ops.Container.pull
+    ) as pull:
+        out = context.run(event, state)
+    return out, [call.args[1] for call in pull.call_args_list]
+
+
+def test_unchanged_config_is_not_pulled(context, loki_container):
+    # GIVEN a config pushed by a previous hook
+    out, _ = _run(context, context.on.config_changed(), State(containers=[loki_container]))
+
+    # WHEN another hook renders the same config
+    _, pulled = _run(context, context.on.config_changed(), out)
+
+    # THEN the running configs are not pulled from the workload
+    assert LOKI_CONFIG not in pulled
+    assert RUNTIME_CONFIG not in pulled
+
+
+def test_changed_config_is_pushed(context, loki_container):
+    # GIVEN a config pushed by a previous hook
+    out, _ = _run(context, context.on.config_changed(), State(containers=[loki_container]))
+
+    # WHEN the config changes
+    state = dataclasses.replace(out, config={"compaction-interval": "1h"})
+    out, _ = _run(context, context.on.config_changed(), state)
+
+    # THEN the new config is pushed
+    fs = out.get_container("loki").get_filesystem(context)
+    config = yaml.safe_load((fs / LOKI_CONFIG.lstrip("/")).read_text())
+    assert config["compactor"]["compaction_interval"] == "1h"
+
+
+def test_running_config_is_checked_after_workload_restart(context, loki_container):
+    # GIVEN a config pushed by a previous hook
+    out, _ = _run(context, context.on.config_changed(), State(containers=[loki_container]))
+
+    # WHEN the workload container restarts
+    _, pulled = _run(context, context.on.pebble_ready(out.get_container("loki")), out)
+
+    # THEN the running configs are checked again
+    assert LOKI_CONFIG in pulled
+    assert RUNTIME_CONFIG in pulled
+
+
+def test_backup_config_is_parsed_once_per_dispatch(context, loki_container):
+    # GIVEN a backup config from a previous hook
+    out, _ = _run(context, context.on.config_changed(), State(containers=[loki_container]))
+
+    # WHEN the schema migration dates are derived from it
+    _, pulled = _run(context, context.on.config_changed(), out)
+
+    # THEN it is pulled only once
+    assert pulled.count(LOKI_CONFIG_BACKUP) == 1
@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock, patch
+
+from charms.tls_certificates_interface.v4.tls_certificates import TLSCertificatesRequiresV4
+from ops.testing import Relation, State
+
+from charm import LokiOperatorCharm
+
+
+def _state(loki_container) -> State:
+    return State(
+        leader=True,
+        containers=[loki_container],
+        relations=[Relation("certificates"), Relation("ingress")],
+    )
+
+
+def test_certificates_are_fetched_once_per_dispatch(context, loki_container):
+    # GIVEN a charm related to a certificates provider
+    tls_calls = patch.object(
+        TLSCertificatesRequiresV4,
+        "get_assigned_certificate",
+        autospec=True,
+        side_effect=TLSCertificatesRequiresV4.get_assigned_certificate,
+    )
+
+    # WHEN config-changed fires
+    with (
+        tls_calls as get_assigned_certificate,
+        patch.object(LokiOperatorCharm, "_check_alert_rules"),
+    ):
+        context.run(context.on.config_changed(), _state(loki_container))
+
+    # THEN the certificates are only read from the TLS library once
+    assert get_assigned_certificate.call_count == 1
+
+
+def test_invalidation_refetches_certificates(context, loki_container):
+    # GIVEN a charm which cached that TLS is not available
+    with context(context.on.update_status(), _state(loki_container)) as mgr:
+        charm = mgr.charm
+        assert not charm._tls_available
+        certificate = MagicMock()
+        certificate.certificate.raw = "CERT"
+        certificate.ca.raw = "CA"
+        private_key = MagicMock(raw="KEY")
+        with patch.object(
+            TLSCertificatesRequiresV4,
+            "get_assigned_certificate",
+            return_value=(certificate, private_key),
+        ) as tls_calls:
+            # WHEN a certificate becomes available later in the dispatch
+            assert not charm._tls_available
+            assert charm._external_url.startswith("http://")
+            assert tls_calls.call_count == 0
+
+            # THEN it is picked up once the cache is invalidated
+            charm._invalidate_dispatch_cache()
+            assert charm._tls_available
+            assert charm._tls_config and charm._tls_config.server_cert == "CERT"
+            assert charm._external_url.startswith("https://")
+            assert tls_calls.call_count == 1
+        mgr.run()
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import pytest
+from ops.testing import State
+
+from charm import LokiOperatorCharm
+
+
+def _loki_environment(rendered_config, config: dict) -> dict:
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out, _, _ = rendered_config(config)
+    return out.get_container("loki").plan.services["loki"].environment
+
+
+@pytest.mark.parametrize(
+    "memory, gomemlimit",
+    [
+        ("2Gi", "1843MiB"),
+        ("512Mi", "460MiB"),
+        ("1000000000", "858MiB"),
+    ],
+)
+def test_gomemlimit_is_derived_from_memory_limit(rendered_config, memory, gomemlimit):
+    # GIVEN a memory limit
+    # WHEN config-changed fires
+    env = _loki_environment(rendered_config, {"memory": memory})
+
+    # THEN the Go soft memory limit leaves the default headroom below the memory limit
+    assert env["GOMEMLIMIT"] == gomemlimit
+    assert "GOGC" not in env
+
+
+def test_go_runtime_settings_are_configurable(rendered_config):
+    # GIVEN a memory limit, a custom headroom and a GC target
+    # WHEN config-changed fires
+    env = _loki_environment(
+        rendered_config, {"memory": "1Gi", "go-memory-limit-headroom-percent": 25, "gogc": "50"}
+    )
+
+    # THEN both are set in the Loki environment
+    assert env["GOMEMLIMIT"] == "768MiB"
+    assert env["GOGC"] == "50"
+
+
+def test_no_gomemlimit_without_memory_limit(rendered_config):
+    # GIVEN no memory limit
+    # WHEN config-changed fires
+    env = _loki_environment(rendered_config, {})
+
+    # THEN the Go runtime keeps its defaults
+    assert "GOMEMLIMIT" not in env
+    assert "GOGC" not in env
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [("go-memory-limit-headroom-percent", 100), ("gogc", "fifty")],
+)
+def test_invalid_go_runtime_config_blocks(context, loki_container, option, value):
+    # GIVEN an invalid Go runtime setting
+    state = State(leader=True, config={option: value}, containers=[loki_container])
+
+    # WHEN config-changed fires
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out = context.run(context.on.config_changed(), state)
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_default_ingestion_limits(rendered_runtime_limits):
+    # GIVEN the default config
+    _, limits = rendered_runtime_limits({})
+
+    # THEN Loki's default cardinality and line limits are rendered
+    assert limits["max_global_streams_per_user"] == 5000
+    assert limits["max_label_names_per_series"] == 15
+    assert limits["max_line_size"] == "256KB"
+    assert limits["max_line_size_truncate"] is False
+    assert limits["reject_old_samples"] is True
+    assert limits["reject_old_samples_max_age"] == "1w"
+    assert limits["creation_grace_period"] == "10m"
+
+
+def test_ingestion_limits_are_configurable(rendered_runtime_limits):
+    # GIVEN custom ingestion limits, accepting samples of any age
+    _, limits = rendered_runtime_limits(
+        {
+            "max-global-streams-per-user": 20000,
+            "max-label-names-per-series": 30,
+            "max-line-size": "1MB",
+            "max-line-size-truncate": True,
+            "reject-old-samples-max-age": "0",
+            "creation-grace-period": "1h",
+        },
+    )
+
+    # THEN they are rendered
+    assert limits["max_global_streams_per_user"] == 20000
+    assert limits["max_label_names_per_series"] == 30
+    assert limits["max_line_size"] == "1MB"
+    assert limits["max_line_size_truncate"] is True
+    assert limits["reject_old_samples"] is False
+    assert limits["creation_grace_period"] == "1h"
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("max-global-streams-per-user", -1),
+        ("max-label-names-per-series", 0),
+        ("max-line-size", "huge"),
+        ("reject-old-samples-max-age", "a week"),
+    ],
+)
+def test_invalid_ingestion_limits_block(rendered_runtime_limits, option, value):
+    # GIVEN an invalid ingestion limit
+    out, _ = rendered_runtime_limits({option: value})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
@@ -0,0 +1,70 @@
+import ops
+from ops.testing import Container, StoredState, pebble
+
+
+def _run(rendered_config, config: dict, memcached: Container, stored_states=frozenset()):
+    out, loki_config, _ = rendered_config(
+        config, containers=[memcached], stored_states=stored_states
+    )
+    return out.get_container("memcached"), loki_config
+
+
+def test_memcached_backend_points_caches_at_sidecar(rendered_config):
+    # GIVEN the memcached cache backend and a ready memcached container
+    memcached, config = _run(
+        rendered_config,
+        {"cache-backend": "memcached", "memcached-memory-mb": 512},
+        Container(name="memcached", can_connect=True),
+    )
+
+    # THEN memcached is running with the configured memory
+    assert memcached.service_statuses["memcached"] == ops.pebble.ServiceStatus.ACTIVE
+    command = memcached.plan.services["memcached"].command
+    assert "-m 512" in command
+
+    # AND it only listens on the loopback address, for Loki in the same pod
+    assert "-l 127.0.0.1" in command
+
+    # AND the chunks and results caches use it instead of the embedded cache
+    for cache in (
+        config["chunk_store_config"]["chunk_cache_config"],
+        config["query_range"]["results_cache"]["cache"],
+    ):
+        assert "embedded_cache" not in cache
+        assert cache["memcached_client"]["addresses"] == "127.0.0.1:11211"
+
+    # AND the index stats cache stays embedded
+    assert config["query_range"]["index_stats_results_cache"]["cache"]["embedded_cache"]
+
+
+def test_embedded_cache_used_until_memcached_is_ready(rendered_config):
+    # GIVEN the memcached cache backend, but memcached is not ready yet
+    _, config = _run(
+        rendered_config,
+        {"cache-backend": "memcached"},
+        Container(name="memcached", can_connect=False),
+    )
+
+    # THEN Loki keeps using the embedded cache
+    assert config["chunk_store_config"]["chunk_cache_config"]["embedded_cache"]["enabled"]
+
+
+def test_embedded_backend_stops_memcached(rendered_config):
+    # GIVEN memcached is running, but the embedded cache backend is configured
+    memcached, config = _run(
+        rendered_config,
+        {"cache-backend": "embedded"},
+        Container(
+            name="memcached",
+            can_connect=True,
+            layers={"memcached": pebble.Layer({"services": {"memcached": {}}})},
+            service_statuses={"memcached": ops.pebble.ServiceStatus.ACTIVE},
+        ),
+        stored_states=frozenset(
+            {StoredState(owner_path="LokiOperatorCharm", content={"memcached_started": True})}
+        ),
+    )
+
+    # THEN memcached is stopped and Loki uses the embedded cache
+    assert memcached.service_statuses["memcached"] == ops.pebble.ServiceStatus.INACTIVE
+    assert "memcached_client" not in config["chunk_store_config"]["chunk_cache_config"]
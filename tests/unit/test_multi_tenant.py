@@ -0,0 +1,181 @@
+import dataclasses
+import json
+from unittest.mock import PropertyMock, patch
+
+import pytest
+import yaml
+from charms.loki_k8s.v1.loki_push_api import LokiPushApiProvider
+from ops.testing import Mount, Relation, State
+
+from charm import LokiOperatorCharm
+from config_builder import RULES_DIR
+
+TENANT_LIMITS = """
+app-b:
+  ingestion_rate_mb: 1
+  max_queriers_per_tenant: 2
+"""
+
+
+def _run(rendered_config, config: dict, relations=()):
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out, loki_config, runtime_config = rendered_config(config, relations=relations)
+    return out, loki_config, runtime_config["overrides"]
+
+
+def _endpoint(out, relation) -> dict:
+    return json.loads(out.get_relation(relation.id).local_unit_data["endpoint"])
+
+
+def test_single_tenant_by_default(rendered_config):
+    # GIVEN a related application, and the default config
+    logging = Relation("logging", remote_app_name="app-a")
+
+    # WHEN config-changed fires
+    out, config, overrides = _run(rendered_config, {}, [logging])
+
+    # THEN all the logs go to the single tenant
+    assert config["auth_enabled"] is False
+    assert list(overrides) == ["fake"]
+    assert "tenant_id" not in _endpoint(out, logging)
+
+
+def test_each_application_gets_its_own_tenant_and_limits(rendered_config):
+    # GIVEN two related applications, and limits for one of them in multi-tenant mode
+    app_a = Relation("logging", remote_app_name="app-a")
+    app_b = Relation("logging", remote_app_name="app-b")
+    config = {"multi-tenant": True, "ingestion-rate-mb": 8, "tenant-limits": TENANT_LIMITS}
+
+    # WHEN config-changed fires
+    out, config, overrides = _run(rendered_config, config, [app_a, app_b])
+
+    # THEN authentication is enabled, and queries can span tenants
+    assert config["auth_enabled"] is True
+    assert config["querier"]["multi_tenant_queries_enabled"] is True
+
+    # AND each application is told its tenant ID
+    assert _endpoint(out, app_a)["tenant_id"] == "app-a"
+    assert _endpoint(out, app_b)["tenant_id"] == "app-b"
+
+    # AND each tenant gets the configured limits, overridden by its own
+    assert sorted(overrides) == ["app-a", "app-b", "fake"]
+    assert overrides["app-a"]["ingestion_rate_mb"] == 8.0
+    assert overrides["app-b"]["ingestion_rate_mb"] == 1
+    assert overrides["app-b"]["max_queriers_per_tenant"] == 2
+    assert (
+        overrides["app-b"]["ingestion_burst_size_mb"]
+        == overrides["app-a"]["ingestion_burst_size_mb"]
+    )
+
+
+def test_alert_rules_are_written_per_tenant(context, loki_container):
+    # GIVEN alert rules from an application in multi-tenant mode
+    app_a = Relation("logging", remote_app_name="app-a")
+    alerts = {
+        "model_uuid_app-a": {"groups": [{"name": "a", "rules": []}], "tenant_id": "app-a"},
+    }
+    state = State(
+        leader=True,
+        config={"multi-tenant": True},
+        containers=[loki_container],
+        relations=[app_a],
+    )
+
+    # WHEN the alert rules files are generated
+    with patch.object(LokiPushApiProvider, "alerts", new_callable=PropertyMock) as mock_alerts:
+        mock_alerts.return_value = alerts
+        with context(context.on.update_status(), state) as mgr:
+            mgr.charm._ensure_alert_rules_path()
+            mgr.charm._sync_alert_rules_files(alerts)
+            out = mgr.run()
+
+    # THEN they are in the directory of the tenant
+    fs = out.get_container("loki").get_filesystem(context)
+    rules_file = fs / RULES_DIR.lstrip("/") / "app-a" / "model_uuid_app-a_alert.rules"
+    assert yaml.safe_load(rules_file.read_text()) == {"groups": [{"name": "a", "rules": []}]}
+
+
+def test_alert_rules_follow_the_multi_tenant_mode(context, loki_container, tmp_path):
+    # GIVEN alert rules from an application
+    app_a = Relation("logging", remote_app_name="app-a")
+    container = dataclasses.replace(
+        loki_container, mounts={"rules": Mount(location=RULES_DIR, source=tmp_path)}
+    )
+    state = State(leader=True, containers=[container], relations=[app_a])
+
+    def switch(state: State, multi_tenant: bool) -> State:
+        tenant = "app-a" if multi_tenant else "fake"
+        alerts = {"m_app-a": {"groups": [{"name": "a", "rules": []}], "tenant_id": tenant}}
+        state = dataclasses.replace(state, config={"multi-tenant": multi_tenant})
+        with (
+            patch.object(LokiPushApiProvider, "alerts", new_callable=PropertyMock) as mock_alerts,
+            patch.object(LokiOperatorCharm, "_update_cert"),
+            patch.object(LokiOperatorCharm, "_check_alert_rules"),
+        ):
+            mock_alerts.return_value = alerts
+            return context.run(context.on.config_changed(), state)
+
+    def rules_files():
+        return sorted(str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*"))
+
+    # WHEN the multi-tenant mode is turned on
+    state = switch(state, multi_tenant=True)
+
+    # THEN the rules are only in the directory of the tenant
+    assert rules_files() == ["app-a", "app-a/m_app-a_alert.rules", "fake"]
+
+    # AND WHEN it is turned off again
+    state = switch(state, multi_tenant=False)
+
+    # THEN the rules are only in the directory of the single tenant
+    assert rules_files() == ["fake", "fake/m_app-a_alert.rules"]
+
+    # AND WHEN it is turned on again
+    switch(state, multi_tenant=True)
+
+    # THEN the rules of the single tenant are removed
+    assert rules_files() == ["app-a", "app-a/m_app-a_alert.rules", "fake"]
+
+
+@pytest.mark.parametrize(
+    "tenant_limits",
+    ["app-b: 1", "app-b:\n  not_a_limit: 100", "- app-b"],
+)
+def test_invalid_tenant_limits_block(rendered_config, tenant_limits):
+    # GIVEN invalid tenant limits
+    # WHEN config-changed fires
+    out, _, _ = _run(rendered_config, {"multi-tenant": True, "tenant-limits": tenant_limits})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert "tenant-limits" in out.unit_status.message
+
+
+def test_single_tenant_keeps_its_retention_in_multi_tenant_mode(rendered_config):
+    # GIVEN logs pushed to the single tenant, and a retention period
+    app_a = Relation("logging", remote_app_name="app-a")
+
+    # WHEN switching to multi-tenant mode
+    _, config, overrides = _run(
+        rendered_config, {"multi-tenant": True, "retention-period": 7}, [app_a]
+    )
+
+    # THEN the logs of the single tenant still expire
+    assert overrides["fake"]["retention_period"] == "7d"
+
+    # AND so do the logs of tenants unknown to the charm
+    assert config["limits_config"]["retention_period"] == "7d"
+    assert config["limits_config"]["ingestion_rate_mb"] == overrides["app-a"]["ingestion_rate_mb"]
+
+
+def test_grafana_queries_the_logs_of_the_single_tenant_too(rendered_config):
+    # GIVEN an application pushing logs, and Grafana
+    app_a = Relation("logging", remote_app_name="app-a")
+    grafana = Relation("grafana-source")
+
+    # WHEN switching to multi-tenant mode
+    out, _, _ = _run(rendered_config, {"multi-tenant": True}, [app_a, grafana])
+
+    # THEN Grafana also queries the logs pushed before the switch
+    source_data = json.loads(out.get_relation(grafana.id).local_app_data["grafana_source_data"])
+    assert source_data["secure_extra_fields"] == {"httpHeaderValue1": "app-a|fake"}
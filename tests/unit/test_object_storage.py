@@ -0,0 +1,207 @@
+import datetime
+import json
+from unittest.mock import patch
+
+import ops
+import pytest
+import yaml
+from ops.testing import Relation, Secret, State
+
+from charm import S3_SECRET_LABEL, LokiOperatorCharm
+from config_builder import LOKI_CONFIG
+
+S3_DATA = {
+    "endpoint": "http://minio.minio.svc.cluster.local:9000",
+    "bucket": "loki",
+    "access-key": "access",
+    "secret-key": "secret",
+    "region": "us-east-1",
+    "s3-uri-style": "path",
+}
+
+
+def _date(days_from_today: int) -> str:
+    today = datetime.datetime.now(datetime.timezone.utc)
+    return (today + datetime.timedelta(days=days_from_today)).strftime("%Y-%m-%d")
+
+
+SAVED_S3_CONFIG = {
+    "endpoint": "minio.minio.svc.cluster.local:9000",
+    "bucket": "loki",
+    "access_key": "access",
+    "secret_key": "secret",
+    "region": "us-east-1",
+    "insecure": True,
+    "path_style": True,
+}
+
+
+def _run(context, loki_container, relations, backup_dates=None, config=None, secrets=()) -> State:
+    backup_dates = backup_dates or {}
+    state = State(
+        leader=True,
+        config=config or {},
+        containers=[loki_container],
+        relations=relations,
+        secrets=secrets,
+    )
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch.object(
+        LokiOperatorCharm, "_chunks_non_empty", return_value=False
+    ), patch.object(
+        LokiOperatorCharm,
+        "_get_schema_config_version_migration_date_from_backup",
+        new=lambda self, version, object_store="filesystem": backup_dates.get(
+            (version, object_store), ""
+        ),
+    ):
+        return context.run(context.on.config_changed(), state)
+
+
+def _loki_config(context, out: State) -> dict:
+    fs = out.get_container("loki").get_filesystem(context)
+    return yaml.safe_load((fs / LOKI_CONFIG.lstrip("/")).read_text())
+
+
+def _rendered_config(context, loki_container, relations, backup_dates=None, config=None) -> dict:
+    return _loki_config(context, _run(context, loki_container, relations, backup_dates, config))
+
+
+def test_chunks_stay_on_filesystem_without_object_storage(context, loki_container):
+    # GIVEN no s3 relation
+    # WHEN config-changed fires
+    config = _rendered_config(context, loki_container, [])
+
+    # THEN all the schema periods use the filesystem
+    assert {c["object_store"] for c in config["schema_config"]["configs"]} == {"filesystem"}
+    assert "aws" not in config["storage_config"]
+
+
+def test_object_storage_period_starts_after_the_latest_period(context, loki_container):
+    # GIVEN an s3 relation on a fresh install, whose v13 period starts today
+    s3 = Relation("s3", remote_app_data=S3_DATA)
+
+    # WHEN config-changed fires
+    config = _rendered_config(context, loki_container, [s3], config={"retention-period": 7})
+
+    # THEN a new period writes the chunks to object storage from tomorrow
+    periods = config["schema_config"]["configs"]
+    assert periods[-2]["object_store"] == "filesystem"
+    assert periods[-2]["from"] == _date(0)
+    assert periods[-1] == {
+        "from": _date(1),
+        "index": {"period": "24h", "prefix": "index_"},
+        "object_store": "s3",
+        "schema": "v13",
+        "store": "tsdb",
+    }
+
+    # AND the bucket is configured from the relation data
+    assert config["storage_config"]["aws"] == {
+        "endpoint": "minio.minio.svc.cluster.local:9000",
+        "bucketnames": "loki",
+        "access_key_id": "access",
+        "secret_access_key": "secret",
+        "region": "us-east-1",
+        "insecure": True,
+        "s3forcepathstyle": True,
+    }
+    assert config["compactor"]["delete_request_store"] == "s3"
+
+
+def test_object_storage_migration_date_is_kept_from_backup(context, loki_container):
+    # GIVEN an s3 relation, and a backup config with an object storage period
+    s3 = Relation("s3", remote_app_data=S3_DATA)
+    backup_dates = {("v13", "filesystem"): "2025-01-01", ("v13", "s3"): "2025-06-01"}
+
+    # WHEN config-changed fires
+    config = _rendered_config(context, loki_container, [s3], backup_dates)
+
+    # THEN the object storage period keeps its date
+    periods = config["schema_config"]["configs"]
+    assert [(c["from"], c["object_store"]) for c in periods[-2:]] == [
+        ("2025-01-01", "filesystem"),
+        ("2025-06-01", "s3"),
+    ]
+
+
+def test_incomplete_s3_relation_data_is_ignored(context, loki_container):
+    # GIVEN an s3 relation without credentials yet, and no chunks in object storage
+    s3 = Relation("s3", remote_app_data={"bucket": "loki"})
+
+    # WHEN config-changed fires
+    config = _rendered_config(context, loki_container, [s3])
+
+    # THEN the chunks stay on the filesystem
+    assert {c["object_store"] for c in config["schema_config"]["configs"]} == {"filesystem"}
+    assert "aws" not in config["storage_config"]
+
+
+def test_object_storage_settings_are_kept(context, loki_container):
+    # GIVEN an s3 relation
+    s3 = Relation("s3", remote_app_data=S3_DATA)
+
+    # WHEN config-changed fires
+    out = _run(context, loki_container, [s3])
+
+    # THEN the bucket settings are kept in a unit secret
+    secret = out.get_secret(label=S3_SECRET_LABEL)
+    assert json.loads(secret.tracked_content["config"]) == SAVED_S3_CONFIG
+
+
+@pytest.mark.parametrize(
+    "relations, status",
+    [
+        ([], "blocked"),
+        ([Relation("s3", remote_app_data={"bucket": "loki"})], "waiting"),
+    ],
+)
+def test_object_storage_period_is_kept_without_s3_relation_data(
+    context, loki_container, relations, status
+):
+    # GIVEN chunks in object storage, whose bucket settings were kept
+    backup_dates = {("v13", "filesystem"): "2025-01-01", ("v13", "s3"): "2025-06-01"}
+    secret = Secret({"config": json.dumps(SAVED_S3_CONFIG)}, owner="unit", label=S3_SECRET_LABEL)
+
+    # WHEN the s3 relation data is missing or incomplete
+    out = _run(context, loki_container, relations, backup_dates, secrets=[secret])
+
+    # THEN the object storage period is still rendered, with the last known bucket settings
+    config = _loki_config(context, out)
+    periods = config["schema_config"]["configs"]
+    assert (periods[-1]["from"], periods[-1]["object_store"]) == ("2025-06-01", "s3")
+    assert config["storage_config"]["aws"]["bucketnames"] == "loki"
+
+    # AND the charm tells the operator
+    assert out.unit_status.name == status
+
+
+def test_object_storage_period_without_bucket_settings_blocks(context, loki_container):
+    # GIVEN chunks in object storage, but no known bucket settings
+    backup_dates = {("v13", "filesystem"): "2025-01-01", ("v13", "s3"): "2025-06-01"}
+
+    # WHEN config-changed fires without the s3 relation
+    out = _run(context, loki_container, [], backup_dates)
+
+    # THEN the config without the object storage period is not pushed
+    fs = out.get_container("loki").get_filesystem(context)
+    assert not (fs / LOKI_CONFIG.lstrip("/")).exists()
+
+    # AND the charm is blocked
+    assert out.unit_status == ops.BlockedStatus(
+        "Chunks are stored in object storage: relate to s3"
+    )
+
+
+def test_bucket_is_requested_when_the_s3_relation_joins(context, loki_container):
+    # GIVEN an s3 relation without data yet
+    s3 = Relation("s3")
+
+    # WHEN it joins
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out = context.run(
+            context.on.relation_joined(s3),
+            State(leader=True, containers=[loki_container], relations=[s3]),
+        )
+
+    # THEN a bucket named after the application is requested
+    assert out.get_relation(s3.id).local_app_data["bucket"] == "loki-k8s"
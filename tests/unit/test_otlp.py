@@ -0,0 +1,101 @@
+import dataclasses
+import datetime
+import json
+from unittest.mock import patch
+
+from ops.testing import Container, Relation
+
+from charm import LokiOperatorCharm
+
+
+def _run(rendered_config, config: dict, v13_date: str):
+    logging = Relation("logging", remote_app_name="otel-collector")
+    migration_dates = [{"version": "v13", "date": v13_date}]
+    with (
+        patch.object(LokiOperatorCharm, "_update_cert"),
+        patch.object(LokiOperatorCharm, "_tsdb_versions_migration_dates", migration_dates),
+    ):
+        out, _, runtime_config = rendered_config(config, relations=[logging])
+    endpoint = json.loads(out.get_relation(logging.id).local_unit_data["endpoint"])
+    return out, endpoint, runtime_config["overrides"]["fake"]
+
+
+def _date(days: int) -> str:
+    today = datetime.datetime.now(datetime.timezone.utc)
+    return (today + datetime.timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def test_otlp_endpoint_is_advertised_once_v13_is_effective(rendered_config):
+    # GIVEN the v13 schema in effect
+    _, endpoint, limits = _run(rendered_config, {}, v13_date=_date(-1))
+
+    # THEN the OTLP endpoint is advertised next to the push API URL
+    assert endpoint["url"] == "http://fqdn:3100/loki/api/v1/push"
+    assert endpoint["otlp_endpoint"] == "http://fqdn:3100/otlp"
+
+    # AND Loki's default mapping of OTLP attributes is kept
+    assert "otlp_config" not in limits
+
+
+def test_otlp_endpoint_is_not_advertised_before_v13(rendered_config):
+    # GIVEN the v13 schema only in effect from tomorrow on
+    _, endpoint, limits = _run(
+        rendered_config, {"otlp-index-labels": "service.name"}, v13_date=_date(1)
+    )
+
+    # THEN neither the OTLP endpoint nor the OTLP attributes mapping are rendered
+    assert "otlp_endpoint" not in endpoint
+    assert "otlp_config" not in limits
+
+
+def test_otlp_can_be_disabled(rendered_config):
+    # GIVEN OTLP ingestion disabled
+    _, endpoint, _ = _run(rendered_config, {"otlp-ingestion": False}, v13_date=_date(-1))
+
+    # THEN the OTLP endpoint is not advertised
+    assert "otlp_endpoint" not in endpoint
+
+
+def test_otlp_index_labels_replace_the_defaults(rendered_config):
+    # GIVEN custom OTLP index labels
+    _, _, limits = _run(
+        rendered_config,
+        {"otlp-index-labels": "service.name, k8s.namespace.name"},
+        v13_date=_date(0),
+    )
+
+    # THEN only those resource attributes are index labels
+    assert limits["otlp_config"] == {
+        "resource_attributes": {
+            "ignore_defaults": True,
+            "attributes_config": [
+                {"action": "index_label", "attributes": ["service.name", "k8s.namespace.name"]}
+            ],
+        }
+    }
+
+
+def test_invalid_otlp_index_labels_block(rendered_config):
+    # GIVEN an invalid attribute name
+    out, _, limits = _run(
+        rendered_config, {"otlp-index-labels": "service name"}, v13_date=_date(0)
+    )
+
+    # THEN the charm is blocked, and Loki's default mapping is kept
+    assert out.unit_status.name == "blocked"
+    assert "otlp-index-labels" in out.unit_status.message
+    assert "otlp_config" not in limits
+
+
+def test_upgrade_with_unreachable_workload_keeps_the_otlp_endpoint(context, rendered_config):
+    # GIVEN the OTLP endpoint advertised while the v13 schema is in effect
+    out, _, _ = _run(rendered_config, {}, v13_date=_date(-1))
+
+    # WHEN the charm is upgraded while the workload container is unreachable
+    container = Container(name="loki", can_connect=False)
+    out = context.run(context.on.upgrade_charm(), dataclasses.replace(out, containers={container}))
+
+    # THEN the hook succeeds, and the last known OTLP endpoint is still advertised
+    logging = next(iter(out.relations))
+    endpoint = json.loads(out.get_relation(logging.id).local_unit_data["endpoint"])
+    assert endpoint["otlp_endpoint"].endswith("/otlp")
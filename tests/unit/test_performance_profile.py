@@ -0,0 +1,100 @@
+import pytest
+from ops.testing import State
+
+
+def test_default_profile_ignores_resource_limits(rendered_config):
+    # GIVEN the default performance profile with resource limits set
+    _, config, _ = rendered_config({"cpu": "2", "memory": "4Gi"})
+
+    # THEN the fixed values are rendered
+    assert config["querier"]["max_concurrent"] == 20
+    assert config["frontend"]["max_outstanding_per_tenant"] == 8192
+    assert "concurrent_flushes" not in config["ingester"]
+    assert "max_size_mb" not in config["chunk_store_config"]["chunk_cache_config"]["embedded_cache"]
+
+
+@pytest.mark.parametrize(
+    "cpu, max_concurrent, max_outstanding, concurrent_flushes",
+    [
+        ("500m", 2, 1024, 4),
+        ("2", 4, 2048, 8),
+        ("16", 32, 16384, 64),
+    ],
+)
+def test_auto_profile_scales_with_cpu_limit(
+    rendered_config, cpu, max_concurrent, max_outstanding, concurrent_flushes
+):
+    # GIVEN the auto performance profile and a cpu limit
+    _, config, _ = rendered_config({"performance-profile": "auto", "cpu": cpu})
+
+    # THEN the query and flush concurrency are derived from the cpu limit
+    assert config["querier"]["max_concurrent"] == max_concurrent
+    assert config["frontend"]["max_outstanding_per_tenant"] == max_outstanding
+    assert config["ingester"]["concurrent_flushes"] == concurrent_flushes
+
+
+def test_auto_profile_sizes_caches_from_memory_limit(rendered_config):
+    # GIVEN the auto performance profile and a memory limit
+    _, config, _ = rendered_config({"performance-profile": "auto", "memory": "8Gi"})
+
+    # THEN the embedded caches are sized from the memory limit
+    chunk_cache = config["chunk_store_config"]["chunk_cache_config"]["embedded_cache"]
+    results_cache = config["query_range"]["results_cache"]["cache"]["embedded_cache"]
+    assert chunk_cache["max_size_mb"] == 614
+    assert results_cache["max_size_mb"] == 368
+
+    # AND settings depending on the unset cpu limit keep their default values
+    assert config["querier"]["max_concurrent"] == 20
+
+
+def test_embedded_cache_memory_percent_applies_to_any_profile(rendered_config):
+    # GIVEN a fixed share of the memory limit reserved for the embedded caches
+    _, config, _ = rendered_config(
+        {"memory": "10Gi", "embedded-cache-memory-percent": 20, "embedded-cache-ttl": "2h"}
+    )
+
+    # THEN every cache gets its share of the cache memory, and the configured ttl
+    query_range = config["query_range"]
+    caches = {
+        "chunks": config["chunk_store_config"]["chunk_cache_config"]["embedded_cache"],
+        "results": query_range["results_cache"]["cache"]["embedded_cache"],
+        "index_stats": query_range["index_stats_results_cache"]["cache"]["embedded_cache"],
+        "volume": query_range["volume_results_cache"]["cache"]["embedded_cache"],
+    }
+    assert {name: cache["max_size_mb"] for name, cache in caches.items()} == {
+        "chunks": 1024,
+        "results": 614,
+        "index_stats": 204,
+        "volume": 204,
+    }
+    assert all(cache["ttl"] == "2h" for cache in caches.values())
+    assert query_range["cache_results"] is True
+
+
+def test_embedded_caches_keep_loki_defaults_without_memory_limit(rendered_config):
+    # GIVEN a share of the memory reserved for the caches, but no memory limit
+    _, config, _ = rendered_config({"embedded-cache-memory-percent": 20})
+
+    # THEN the caches are not sized explicitly
+    assert "max_size_mb" not in config["chunk_store_config"]["chunk_cache_config"]["embedded_cache"]
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("performance-profile", "turbo"),
+        ("embedded-cache-memory-percent", 80),
+        ("embedded-cache-ttl", "an hour"),
+    ],
+)
+def test_invalid_config_blocks(context, loki_container, option, value):
+    # GIVEN an invalid config value
+    state = State(leader=True, config={option: value}, containers=[loki_container])
+
+    # WHEN config-changed fires
+    out = context.run(context.on.config_changed(), state)
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
+
@@ -0,0 +1,79 @@
+import pytest
+
+
+def test_default_profile_uses_loki_query_limits(rendered_runtime_limits):
+    # GIVEN the default performance profile with resource limits set
+    _, limits = rendered_runtime_limits({"cpu": "2", "memory": "4Gi"})
+
+    # THEN Loki's default query limits are rendered
+    assert limits["max_entries_limit_per_query"] == 5000
+    assert limits["max_query_series"] == 500
+    assert limits["max_query_length"] == "721h"
+    assert limits["max_query_lookback"] == "0"
+    assert limits["query_timeout"] == "1m"
+    assert limits["max_streams_matchers_per_query"] == 1000
+
+
+@pytest.mark.parametrize(
+    "cpu, memory, max_entries, max_series, max_length",
+    [
+        ("500m", "1Gi", 1000, 100, "45h"),
+        ("2", "8Gi", 2500, 250, "180h"),
+        ("16", "32Gi", 10000, 1000, "721h"),
+    ],
+)
+def test_auto_profile_scales_query_limits(
+    rendered_runtime_limits, cpu, memory, max_entries, max_series, max_length
+):
+    # GIVEN the auto performance profile and resource limits
+    _, limits = rendered_runtime_limits(
+        {"performance-profile": "auto", "cpu": cpu, "memory": memory}
+    )
+
+    # THEN the query limits are derived from the resource limits
+    assert limits["max_entries_limit_per_query"] == max_entries
+    assert limits["max_query_series"] == max_series
+    assert limits["max_query_length"] == max_length
+
+
+def test_query_limits_are_configurable(rendered_runtime_limits):
+    # GIVEN explicit query limits with the auto performance profile
+    _, limits = rendered_runtime_limits(
+        {
+            "performance-profile": "auto",
+            "cpu": "1",
+            "memory": "2Gi",
+            "max-entries-limit-per-query": 20000,
+            "max-query-series": 2000,
+            "max-query-length": "0",
+            "max-query-lookback": "720h",
+            "query-timeout": "5m",
+            "max-streams-matchers-per-query": 50,
+        },
+    )
+
+    # THEN they take precedence over the profile
+    assert limits["max_entries_limit_per_query"] == 20000
+    assert limits["max_query_series"] == 2000
+    assert limits["max_query_length"] == "0"
+    assert limits["max_query_lookback"] == "720h"
+    assert limits["query_timeout"] == "5m"
+    assert limits["max_streams_matchers_per_query"] == 50
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("max-entries-limit-per-query", -1),
+        ("max-query-length", "30 days"),
+        ("query-timeout", "0"),
+        ("max-streams-matchers-per-query", 0),
+    ],
+)
+def test_invalid_query_limits_block(rendered_runtime_limits, option, value):
+    # GIVEN an invalid query limit
+    out, _ = rendered_runtime_limits({option: value})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
@@ -0,0 +1,26 @@
+def test_query_logging_is_disabled_by_default(rendered_config):
+    # GIVEN the default config
+    _, config, _ = rendered_config({})
+
+    # THEN neither slow queries nor query statistics are logged
+    assert config["frontend"]["log_queries_longer_than"] == "0"
+    assert config["frontend"]["query_stats_enabled"] is False
+
+
+def test_query_logging_is_configurable(rendered_config):
+    # GIVEN slow-query logging and query statistics enabled
+    _, config, _ = rendered_config({"log-queries-longer-than": "10s", "query-stats-enabled": True})
+
+    # THEN the query frontend logs them
+    assert config["frontend"]["log_queries_longer_than"] == "10s"
+    assert config["frontend"]["query_stats_enabled"] is True
+
+
+def test_invalid_slow_query_threshold_blocks(rendered_config):
+    # GIVEN an invalid slow-query threshold
+    out, config, _ = rendered_config({"log-queries-longer-than": "10 seconds"})
+
+    # THEN the charm is blocked, and slow queries are not logged
+    assert out.unit_status.name == "blocked"
+    assert "log-queries-longer-than" in out.unit_status.message
+    assert config["frontend"]["log_queries_longer_than"] == "0"
@@ -0,0 +1,59 @@
+import pytest
+
+
+def _run(rendered_config, config: dict):
+    out, loki_config, runtime_config = rendered_config(config)
+    # Per-tenant limits are rendered into the runtime config
+    loki_config["limits_config"].update(runtime_config["overrides"]["fake"])
+    return out, loki_config
+
+
+def test_queries_are_not_split_by_default(rendered_config):
+    _, config = _run(rendered_config, {})
+
+    assert config["limits_config"]["split_queries_by_interval"] == "0"
+    assert config["query_range"]["parallelise_shardable_queries"] is False
+
+
+def test_query_parallelism_is_rendered(rendered_config):
+    # GIVEN query splitting, sharding and parallelism that fit the frontend queue
+    out, config = _run(
+        rendered_config,
+        {
+            "query-split-interval": "1h",
+            "max-query-parallelism": 16,
+            "tsdb-max-query-parallelism": 64,
+            "query-sharding": True,
+        },
+    )
+
+    # THEN they are rendered into the Loki config
+    assert config["limits_config"]["split_queries_by_interval"] == "1h"
+    assert config["limits_config"]["max_query_parallelism"] == 16
+    assert config["limits_config"]["tsdb_max_query_parallelism"] == 64
+    assert config["query_range"]["parallelise_shardable_queries"] is True
+    assert out.unit_status.name == "active"
+
+
+def test_parallelism_defaults_follow_querier_concurrency(rendered_config):
+    # GIVEN the auto performance profile on 2 cpus (4 concurrent queries)
+    _, config = _run(rendered_config, {"performance-profile": "auto", "cpu": "2"})
+
+    # THEN the parallelism is derived from the querier concurrency
+    assert config["limits_config"]["max_query_parallelism"] == 4
+    assert config["limits_config"]["tsdb_max_query_parallelism"] == 16
+
+
+@pytest.mark.parametrize("option", ["max-query-parallelism", "tsdb-max-query-parallelism"])
+def test_parallelism_overflowing_the_frontend_queue_blocks(rendered_config, option):
+    # GIVEN a parallelism that would let the querier slots overflow the frontend queue
+    # (20 concurrent queries * 512 > 8192 outstanding requests)
+    out, config = _run(rendered_config, {"query-split-interval": "30m", option: 512})
+
+    # THEN the charm is blocked
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
+
+    # AND the parallelism falls back to the default values
+    assert config["limits_config"]["max_query_parallelism"] == 20
+    assert config["limits_config"]["tsdb_max_query_parallelism"] == 80
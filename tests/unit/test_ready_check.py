@@ -0,0 +1,119 @@
+import dataclasses
+from unittest.mock import patch
+
+import ops
+from ops.testing import CheckInfo, State, StoredState
+
+from charm import READY_CHECK, LokiOperatorCharm, to_tuple
+
+ACTIVE = to_tuple(ops.ActiveStatus())
+
+
+def _with_ready_check(loki_container, status=ops.pebble.CheckStatus.UP):
+    check = CheckInfo(READY_CHECK, level=ops.pebble.CheckLevel.READY, status=status)
+    layer = ops.pebble.Layer(
+        {
+            "services": {"loki": {}},
+            "checks": {READY_CHECK: {"level": "ready", "http": {"url": "http://fqdn:3100/ready"}}},
+        }
+    )
+    return dataclasses.replace(loki_container, layers={"loki": layer}, check_infos={check}), check
+
+
+def _ready_check_recovered(context, loki_container):
+    container, check = _with_ready_check(loki_container)
+    return context.on.pebble_check_recovered(container, info=check), container
+
+
+def _state(loki_container, rules_status=ACTIVE) -> State:
+    status = {"k8s_patch": ACTIVE, "config": ACTIVE, "rules": rules_status, "retention": ACTIVE}
+    return State(
+        leader=True,
+        containers=[loki_container],
+        stored_states=[StoredState(owner_path="LokiOperatorCharm", content={"status": status})],
+    )
+
+
+def test_layer_has_http_ready_check(context, loki_container):
+    # GIVEN a Loki workload
+    # WHEN it is configured
+    with patch.object(LokiOperatorCharm, "_check_alert_rules"):
+        out = context.run(context.on.config_changed(), _state(loki_container))
+
+    # THEN Pebble checks whether Loki is ready over HTTP
+    check = out.get_container("loki").plan.checks[READY_CHECK]
+    assert check.level == ops.pebble.CheckLevel.READY
+    assert check.http == {"url": "http://fqdn:3100/ready"}
+
+
+def test_restart_defers_rule_verification_to_ready_check(context, loki_container):
+    # GIVEN alert rules which could not be verified earlier
+    state = _state(loki_container, to_tuple(ops.BlockedStatus("Failed to verify alert rules")))
+
+    # WHEN a config change restarts Loki
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        context.run(context.on.config_changed(), state)
+
+    # THEN the hook does not wait for Loki to verify the rules
+    check_alert_rules.assert_not_called()
+
+
+def test_ready_check_recovery_verifies_rules(context, loki_container):
+    # GIVEN alert rules which could not be verified while Loki was restarting
+    event, container = _ready_check_recovered(context, loki_container)
+    state = _state(container, to_tuple(ops.BlockedStatus("Failed to verify alert rules")))
+
+    # WHEN Loki becomes ready
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        context.run(event, state)
+
+    # THEN the rules are verified
+    check_alert_rules.assert_called_once()
+
+
+def test_ready_check_recovery_skips_verified_rules(context, loki_container):
+    # GIVEN alert rules which are already verified
+    event, container = _ready_check_recovered(context, loki_container)
+
+    # WHEN Loki becomes ready
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        context.run(event, _state(container))
+
+    # THEN they are not verified again
+    check_alert_rules.assert_not_called()
+
+
+def test_rules_are_verified_once_ready_without_the_check_failing(context, loki_container):
+    # GIVEN Loki restarted by a config change
+    with patch.object(LokiOperatorCharm, "_check_alert_rules"):
+        out = context.run(context.on.config_changed(), _state(loki_container))
+
+    # WHEN update-status fires, while Loki is not ready yet
+    container, _ = _with_ready_check(out.get_container("loki"), ops.pebble.CheckStatus.DOWN)
+    state = dataclasses.replace(out, containers=[container])
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        out = context.run(context.on.update_status(), state)
+
+    # THEN the rules are not verified yet
+    check_alert_rules.assert_not_called()
+
+    # AND WHEN update-status fires once Loki is ready, its ready check having never failed
+    container, _ = _with_ready_check(out.get_container("loki"))
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        context.run(context.on.update_status(), dataclasses.replace(out, containers=[container]))
+
+    # THEN the rules are verified
+    check_alert_rules.assert_called_once()
+
+
+def test_verified_rules_are_not_checked_on_update_status(context, loki_container):
+    # GIVEN a ready Loki, whose rules are verified
+    container, _ = _with_ready_check(loki_container)
+    state = _state(container)
+
+    # WHEN update-status fires
+    with patch.object(LokiOperatorCharm, "_check_alert_rules") as check_alert_rules:
+        context.run(context.on.update_status(), state)
+
+    # THEN the rules are not verified again
+    check_alert_rules.assert_not_called()
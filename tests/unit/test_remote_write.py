@@ -0,0 +1,51 @@
+import json
+
+from ops.testing import Relation
+
+from config_builder import RULER_WAL_DIR
+
+
+def _ruler_config(rendered_config, relations=()) -> dict:
+    return rendered_config(relations=relations)[1]["ruler"]
+
+
+def _remote_write(url: str) -> dict:
+    return {"remote_write": json.dumps({"url": url})}
+
+
+def test_no_remote_write_without_relation(rendered_config):
+    # GIVEN no send-remote-write relation
+    ruler = _ruler_config(rendered_config)
+
+    # THEN the ruler does not remote-write the results of recording rules
+    assert "remote_write" not in ruler
+    assert "wal" not in ruler
+
+
+def test_ruler_remote_writes_to_every_unit(rendered_config):
+    # GIVEN a send-remote-write relation to a Prometheus with two units
+    relation = Relation(
+        "send-remote-write",
+        remote_units_data={
+            0: _remote_write("http://prom-0:9090/api/v1/write"),
+            1: _remote_write("http://prom-1:9090/api/v1/write"),
+        },
+    )
+    ruler = _ruler_config(rendered_config, [relation])
+
+    # THEN the ruler remote-writes to both units, through its WAL
+    assert ruler["wal"] == {"dir": RULER_WAL_DIR}
+    assert ruler["remote_write"]["enabled"] is True
+    urls = sorted(client["url"] for client in ruler["remote_write"]["clients"].values())
+    assert urls == ["http://prom-0:9090/api/v1/write", "http://prom-1:9090/api/v1/write"]
+
+
+def test_incomplete_remote_write_data_is_ignored(rendered_config):
+    # GIVEN a send-remote-write relation whose units have not advertised a valid endpoint yet
+    relation = Relation(
+        "send-remote-write", remote_units_data={0: {}, 1: {"remote_write": "not json"}}
+    )
+    ruler = _ruler_config(rendered_config, [relation])
+
+    # THEN the ruler does not remote-write
+    assert "remote_write" not in ruler
@@ -0,0 +1,68 @@
+import pytest
+
+RETENTION_STREAMS = """
+- selector: '{juju_application="noisy-app", level="debug"}'
+  period: 24h
+- selector: '{juju_model="staging"}'
+  period: 3d
+  priority: 2
+"""
+
+
+def _run(rendered_config, config: dict):
+    out, loki_config, runtime_config = rendered_config(config)
+    return out, loki_config, runtime_config["overrides"]["fake"]
+
+
+def test_retention_streams_are_rendered_into_tenant_limits(rendered_config):
+    # GIVEN per-stream retention rules, and no global retention period
+    _, config, limits = _run(rendered_config, {"retention-streams": RETENTION_STREAMS})
+
+    # THEN the rules are rendered into the per-tenant limits
+    assert limits["retention_stream"] == [
+        {
+            "selector": '{juju_application="noisy-app", level="debug"}',
+            "priority": 1,
+            "period": "24h",
+        },
+        {"selector": '{juju_model="staging"}', "priority": 2, "period": "3d"},
+    ]
+    assert limits["retention_period"] == "0d"
+
+    # AND the compactor applies retention
+    assert config["compactor"]["retention_enabled"] is True
+    assert config["compactor"]["delete_request_store"] == "filesystem"
+
+
+def test_compactor_is_tunable(rendered_config):
+    # GIVEN compactor settings
+    _, config, _ = _run(
+        rendered_config, {"compaction-interval": "5m", "retention-delete-worker-count": 300}
+    )
+
+    # THEN they are rendered, without enabling retention
+    compactor = config["compactor"]
+    assert compactor["compaction_interval"] == "5m"
+    assert compactor["retention_delete_worker_count"] == 300
+    assert compactor["retention_enabled"] is False
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("retention-streams", "- selector: 'juju_application=\"app\"'\n  period: 24h"),
+        ("retention-streams", "- selector: '{app=\"app\"}'\n  period: 1h"),
+        ("retention-streams", "selector: '{app=\"app\"}'"),
+        ("compaction-interval", "often"),
+        ("retention-delete-worker-count", 0),
+    ],
+)
+def test_invalid_retention_config_blocks(rendered_config, option, value):
+    # GIVEN an invalid retention setting
+    # WHEN config-changed fires
+    out, _, limits = _run(rendered_config, {option: value})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
+    assert limits["retention_stream"] == []
@@ -0,0 +1,74 @@
+import pytest
+from ops.testing import StoredState
+
+
+def _run(rendered_config, config: dict, rule_count: int = 0):
+    out, loki_config, _ = rendered_config(
+        config,
+        stored_states={
+            StoredState(owner_path="LokiOperatorCharm", content={"rule_count": rule_count})
+        },
+    )
+    return out, loki_config["ruler"]
+
+
+def test_few_rules_are_evaluated_locally(rendered_config):
+    # GIVEN a few rules
+    _, ruler = _run(rendered_config, {}, rule_count=20)
+
+    # THEN the ruler evaluates them every minute, on its own querier
+    assert ruler["evaluation_interval"] == "1m"
+    assert ruler["evaluation"] == {"mode": "local", "max_jitter": "0s"}
+
+
+def test_many_rules_are_still_evaluated_locally_by_default(rendered_config):
+    # GIVEN many rules
+    _, ruler = _run(rendered_config, {}, rule_count=150)
+
+    # THEN the ruler keeps evaluating them on its own querier, without restarting Loki
+    assert ruler["evaluation"] == {"mode": "local", "max_jitter": "0s"}
+
+
+def test_many_rules_are_evaluated_through_the_frontend_in_auto_mode(rendered_config):
+    # GIVEN many rules, and the auto evaluation mode
+    config = {"ruler-evaluation-mode": "auto", "ruler-evaluation-interval": "2m"}
+    _, ruler = _run(rendered_config, config, rule_count=150)
+
+    # THEN the ruler evaluates them through the local query frontend, spread over the interval
+    assert ruler["evaluation_interval"] == "2m"
+    assert ruler["evaluation"] == {
+        "mode": "remote",
+        "max_jitter": "24s",
+        "query_frontend": {"address": "dns:///fqdn:9095"},
+    }
+
+
+@pytest.mark.parametrize("mode, rule_count, expected", [("local", 500, "local"), ("remote", 1, "remote")])
+def test_evaluation_mode_is_configurable(rendered_config, mode, rule_count, expected):
+    # GIVEN an explicit evaluation mode and jitter
+    _, ruler = _run(
+        rendered_config,
+        {"ruler-evaluation-mode": mode, "ruler-evaluation-max-jitter": "5s"},
+        rule_count=rule_count,
+    )
+
+    # THEN they take precedence over the rule count
+    assert ruler["evaluation"]["mode"] == expected
+    assert ruler["evaluation"]["max_jitter"] == "5s"
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("ruler-evaluation-interval", "0"),
+        ("ruler-evaluation-mode", "distributed"),
+        ("ruler-evaluation-max-jitter", "a bit"),
+    ],
+)
+def test_invalid_ruler_evaluation_settings_block(rendered_config, option, value):
+    # GIVEN an invalid ruler evaluation setting
+    out, _ = _run(rendered_config, {option: value})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
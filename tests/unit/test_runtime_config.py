@@ -0,0 +1,82 @@
+from dataclasses import replace
+from unittest.mock import patch
+
+import ops
+import pytest
+import yaml
+from ops.testing import Container, Exec, Mount, State, pebble
+
+from charm import LokiOperatorCharm
+from config_builder import RUNTIME_CONFIG
+
+
+@pytest.fixture
+def loki_container(tmp_path):
+    # Mount the config dir, so that the config files persist across runs.
+    return Container(
+        name="loki",
+        can_connect=True,
+        layers={"loki": pebble.Layer({"services": {"loki": {"startup": "enabled"}}})},
+        service_statuses={"loki": ops.pebble.ServiceStatus.ACTIVE},
+        execs={Exec(["update-ca-certificates", "--fresh"], return_code=0)},
+        mounts={"config": Mount(location="/etc/loki", source=tmp_path)},
+    )
+
+
+def _config_changed(context, state):
+    """Run config-changed and return the output state and the number of Loki restarts."""
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch.object(
+        ops.Container, "restart", autospec=True
+    ) as restart:
+        out = context.run(context.on.config_changed(), state)
+    return out, restart.call_count
+
+
+def test_tenant_limits_are_rendered_into_runtime_config(context, loki_container, tmp_path):
+    # GIVEN ingestion and retention limits
+    state = State(
+        leader=True,
+        config={"ingestion-rate-mb": 8, "ingestion-burst-size-mb": 16, "retention-period": 7},
+        containers=[loki_container],
+    )
+
+    # WHEN config-changed fires
+    _config_changed(context, state)
+
+    # THEN the limits are rendered into the runtime config
+    overrides = yaml.safe_load((tmp_path / "runtime-config.yaml").read_text())["overrides"]
+    assert overrides["fake"]["ingestion_rate_mb"] == 8.0
+    assert overrides["fake"]["ingestion_burst_size_mb"] == 16.0
+    assert overrides["fake"]["retention_period"] == "7d"
+
+    # AND the static config references the runtime config
+    config = yaml.safe_load((tmp_path / "loki-local-config.yaml").read_text())
+    assert config["runtime_config"]["file"] == RUNTIME_CONFIG
+    assert "ingestion_rate_mb" not in config["limits_config"]
+
+
+def test_changing_tenant_limits_does_not_restart_loki(context, loki_container, tmp_path):
+    # GIVEN a configured and running Loki
+    state, restarts = _config_changed(
+        context, State(leader=True, config={"ingestion-rate-mb": 4}, containers=[loki_container])
+    )
+    assert restarts == 1
+
+    # WHEN only a hot-reloadable limit changes
+    _, restarts = _config_changed(context, replace(state, config={"ingestion-rate-mb": 10}))
+
+    # THEN the runtime config is updated without restarting Loki
+    overrides = yaml.safe_load((tmp_path / "runtime-config.yaml").read_text())["overrides"]
+    assert overrides["fake"]["ingestion_rate_mb"] == 10.0
+    assert restarts == 0
+
+
+def test_changing_static_config_restarts_loki(context, loki_container):
+    # GIVEN a configured and running Loki
+    state, _ = _config_changed(context, State(leader=True, containers=[loki_container]))
+
+    # WHEN a setting of the static config changes
+    _, restarts = _config_changed(context, replace(state, config={"chunk-encoding": "zstd"}))
+
+    # THEN Loki is restarted
+    assert restarts == 1
@@ -0,0 +1,206 @@
+import json
+from unittest.mock import patch
+
+import ops
+import pytest
+import yaml
+from ops.testing import Context, PeerRelation, Relation, State
+
+from charm import LokiOperatorCharm
+from config_builder import LOKI_CONFIG
+
+# The scalable mode requires object storage.
+S3_DATA = {
+    "endpoint": "http://minio.minio.svc.cluster.local:9000",
+    "bucket": "loki",
+    "access-key": "access",
+    "secret-key": "secret",
+}
+
+
+def _hostname(unit_id: int, own_unit_id: int) -> str:
+    # The hostname of the unit under test is patched in conftest.
+    return "fqdn" if unit_id == own_unit_id else f"loki-{unit_id}.loki-endpoints"
+
+
+def _run(
+    loki_charm, loki_container, unit_id: int, config: dict, relations=(), units=tuple(range(6))
+):
+    # The other units of a 6 units deployment share their addresses over the peer relation.
+    peers = PeerRelation(
+        "replicas",
+        peers_data={n: {"hostname": _hostname(n, unit_id)} for n in units if n != unit_id},
+    )
+    s3 = Relation("s3", remote_app_data=S3_DATA)
+    context = Context(loki_charm, unit_id=unit_id)
+    state = State(
+        leader=unit_id == 0,
+        config=config,
+        containers=[loki_container],
+        relations=[peers, s3, *relations],
+        planned_units=len(units),
+    )
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch.object(
+        LokiOperatorCharm, "_chunks_non_empty", return_value=False
+    ):
+        out = context.run(context.on.config_changed(), state)
+    fs = out.get_container("loki").get_filesystem(context)
+    return out, yaml.safe_load((fs / LOKI_CONFIG.lstrip("/")).read_text())
+
+
+def test_single_target_keeps_rings_in_memory(loki_charm, loki_container):
+    # GIVEN the default target
+    # WHEN config-changed fires
+    out, config = _run(loki_charm, loki_container, 0, {})
+
+    # THEN the unit runs all components, with in-memory rings and no replication
+    assert config["target"] == "all"
+    assert config["common"]["ring"]["kvstore"]["store"] == "inmemory"
+    assert config["common"]["replication_factor"] == 1
+    assert "memberlist" not in config
+    assert "compactor_address" not in config["common"]
+
+    # AND the unit shares its address with its peers
+    assert out.get_relations("replicas")[0].local_unit_data["hostname"] == "fqdn"
+
+
+@pytest.mark.parametrize("unit_id, target", [(0, "write"), (1, "read"), (2, "backend"), (3, "write")])
+def test_targets_are_assigned_by_unit_number(loki_charm, loki_container, unit_id, target):
+    # GIVEN a list of targets for the scalable mode
+    # WHEN config-changed fires
+    _, config = _run(loki_charm, loki_container, unit_id, {"target": "write,read,backend"})
+
+    # THEN each unit gets its target in turn
+    assert config["target"] == target
+
+    # AND the rings are shared over memberlist by all the units
+    assert config["common"]["ring"]["kvstore"]["store"] == "memberlist"
+    assert len(config["memberlist"]["join_members"]) == 6
+    assert "fqdn:7946" in config["memberlist"]["join_members"]
+    assert "loki-5.loki-endpoints:7946" in config["memberlist"]["join_members"]
+
+    # AND the logs are not replicated across 2 write units, as either could not restart
+    assert config["common"]["replication_factor"] == 1
+    assert config["common"]["compactor_address"] == f"http://{_hostname(2, unit_id)}:3100"
+
+
+def test_replication_factor_is_bounded(loki_charm, loki_container):
+    # GIVEN a scalable mode where most units run the write path
+    # WHEN config-changed fires
+    _, config = _run(
+        loki_charm, loki_container, 0, {"target": "write,write,write,write,write,read"}
+    )
+
+    # THEN the replication factor does not grow beyond 3
+    assert config["common"]["replication_factor"] == 3
+
+
+def test_replication_factor_counts_the_units_left_after_a_scale_down(loki_charm, loki_container):
+    # GIVEN 3 units left after a scale down, all of them running the write path
+    # WHEN config-changed fires
+    _, config = _run(
+        loki_charm, loki_container, 0, {"target": "write,read,backend"}, units=(0, 3, 6)
+    )
+
+    # THEN the logs are replicated across the 3 write units
+    assert config["common"]["replication_factor"] == 3
+
+
+def test_read_units_point_log_producers_to_write_units(loki_charm, loki_container):
+    # GIVEN a read unit related to a log producer
+    logging = Relation("logging")
+
+    # WHEN config-changed fires
+    out, _ = _run(loki_charm, loki_container, 1, {"target": "write,read"}, relations=[logging])
+
+    # THEN the push endpoint is served by a write unit
+    endpoint = json.loads(out.get_relation(logging.id).local_unit_data["endpoint"])
+    assert endpoint["url"] == "http://loki-0.loki-endpoints:3100/loki/api/v1/push"
+
+
+def test_all_units_are_scraped(loki_charm, loki_container):
+    # GIVEN a leader related to a metrics consumer
+    metrics = Relation("metrics-endpoint")
+
+    # WHEN config-changed fires
+    out, _ = _run(loki_charm, loki_container, 0, {}, relations=[metrics])
+
+    # THEN all the units are scraped
+    jobs = json.loads(out.get_relation(metrics.id).local_app_data["scrape_jobs"])
+    targets = [target for job in jobs for config in job["static_configs"] for target in config["targets"]]
+    assert "fqdn:3100" in targets
+    assert "loki-5.loki-endpoints:3100" in targets
+    assert "loki-5.loki-endpoints:9100" in targets
+
+
+def test_invalid_target_blocks(loki_charm, loki_container):
+    # GIVEN an unknown target
+    # WHEN config-changed fires
+    out, config = _run(loki_charm, loki_container, 0, {"target": "write,query"})
+
+    # THEN the charm is blocked, and all the components keep running on the unit
+    assert out.unit_status.name == "blocked"
+    assert "target" in out.unit_status.message
+    assert config["target"] == "all"
+
+
+def test_backend_evaluates_rules_through_read_units(loki_charm, loki_container):
+    # GIVEN remote rule evaluation in the scalable mode
+    # WHEN config-changed fires on a backend unit, which runs the ruler
+    _, config = _run(
+        loki_charm,
+        loki_container,
+        2,
+        {"target": "write,read,backend", "ruler-evaluation-mode": "remote"},
+    )
+
+    # THEN the rules are evaluated through the query frontend of a read unit
+    address = config["ruler"]["evaluation"]["query_frontend"]["address"]
+    assert address == "dns:///loki-1.loki-endpoints:9095"
+
+
+def test_scalable_mode_without_object_storage_blocks(loki_charm, loki_container):
+    # GIVEN the scalable mode without an s3 relation
+    context = Context(loki_charm)
+    state = State(config={"target": "write,read,backend"}, containers=[loki_container])
+
+    # WHEN config-changed fires
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out = context.run(context.on.config_changed(), state)
+
+    # THEN the charm is blocked, and Loki is not configured
+    assert out.unit_status == ops.BlockedStatus(
+        "The scalable mode requires object storage: relate to s3"
+    )
+    fs = out.get_container("loki").get_filesystem(context)
+    assert not (fs / LOKI_CONFIG.lstrip("/")).exists()
+
+
+def test_grafana_queries_a_read_unit(loki_charm, loki_container):
+    # GIVEN a write unit, the leader, related to Grafana
+    grafana = Relation("grafana-source")
+
+    # WHEN config-changed fires
+    out, _ = _run(
+        loki_charm, loki_container, 0, {"target": "write,read,backend"}, relations=[grafana]
+    )
+
+    # THEN Grafana queries the logs through a read unit
+    app_host = out.get_relation(grafana.id).local_app_data["grafana_source_app_host"]
+    assert app_host == "http://loki-1.loki-endpoints:3100"
+
+
+@pytest.mark.parametrize("unit_id, checked", [(0, False), (1, False), (2, True)])
+def test_alert_rules_are_only_checked_by_the_ruler(loki_charm, loki_container, unit_id, checked):
+    # GIVEN alert rules which could not be verified yet
+    # WHEN they are checked on the units of the scalable mode
+    context = Context(loki_charm, unit_id=unit_id)
+    state = State(config={"target": "write,read,backend"}, containers=[loki_container])
+    with context(context.on.update_status(), state) as mgr:
+        with patch("urllib.request.urlopen") as urlopen:
+            mgr.charm._check_alert_rules()
+        out = mgr.run()
+
+    # THEN only the backend units, which run the ruler, query the rules API
+    assert urlopen.called == checked
+    assert out.unit_status == ops.ActiveStatus()
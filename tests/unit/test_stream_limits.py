@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_per_stream_limits_follow_per_tenant_limits_by_default(rendered_runtime_limits):
+    # GIVEN per-tenant ingestion limits only
+    _, limits = rendered_runtime_limits({"ingestion-rate-mb": 10, "ingestion-burst-size-mb": 20})
+
+    # THEN the per-stream limits match them, and streams are not sharded
+    assert limits["per_stream_rate_limit"] == "10MB"
+    assert limits["per_stream_rate_limit_burst"] == "20MB"
+    assert limits["shard_streams"] == {"enabled": False, "desired_rate": "1536KB"}
+
+
+def test_per_stream_limits_are_configurable(rendered_runtime_limits):
+    # GIVEN separate per-stream limits
+    _, limits = rendered_runtime_limits(
+        {
+            "ingestion-rate-mb": 10,
+            "ingestion-burst-size-mb": 20,
+            "per-stream-rate-limit-mb": 5,
+            "per-stream-rate-limit-burst-mb": 8,
+        },
+    )
+
+    # THEN they are rendered independently of the per-tenant limits
+    assert limits["ingestion_rate_mb"] == 10.0
+    assert limits["per_stream_rate_limit"] == "5MB"
+    assert limits["per_stream_rate_limit_burst"] == "8MB"
+
+
+def test_stream_sharding_is_rendered(rendered_runtime_limits):
+    # GIVEN stream sharding with a desired shard rate
+    _, limits = rendered_runtime_limits(
+        {"shard-streams": True, "shard-streams-desired-rate": "3MB"}
+    )
+
+    # THEN the distributor shards hot streams at that rate
+    assert limits["shard_streams"] == {"enabled": True, "desired_rate": "3MB"}
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("per-stream-rate-limit-mb", -1),
+        ("per-stream-rate-limit-burst-mb", -1),
+        ("shard-streams-desired-rate", "fast"),
+    ],
+)
+def test_invalid_stream_limits_block(rendered_runtime_limits, option, value):
+    # GIVEN an invalid per-stream setting
+    out, _ = rendered_runtime_limits({option: value})
+
+    # THEN the charm is blocked, naming the invalid option
+    assert out.unit_status.name == "blocked"
+    assert option in out.unit_status.message
@@ -2,11 +2,12 @@
 # See LICENSE file for licensing details.
 """Scenario tests for the TSDB schema migration date logic."""
 
+import dataclasses
 import datetime
 from unittest.mock import patch
 
 import yaml
-from scenario import State
+from scenario import Mount, State
 
 from charm import LokiOperatorCharm
 from config_builder import LOKI_CONFIG
@@ -15,10 +16,13 @@ from config_builder import LOKI_CONFIG
 def _mock_backup(v13_date="", v12_date=""):
     """Return a callable for patching _get_schema_config_version_migration_date_from_backup.
 
-    The returned function mirrors the real method signature (self, sc_version)
-    and looks up the requested schema version in the provided mapping.
+    The returned function mirrors the real method signature (self, sc_version, object_store)
+    and looks up the requested schema version of the filesystem periods in the provided mapping.
     """
-    return lambda self, sc_version: {"v13": v13_date, "v12": v12_date}.get(sc_version, "")
+    dates = {("v13", "filesystem"): v13_date, ("v12", "filesystem"): v12_date}
+    return lambda self, sc_version, object_store="filesystem": dates.get(
+        (sc_version, object_store), ""
+    )
 
 
 def test_fresh_install_no_backup_uses_today(context, loki_container):
@@ -111,13 +115,23 @@ def test_chunks_exist_no_backup_uses_tomorrow(context, loki_container):
     assert v13_entries[0]["date"] == expected
 
 
-def test_v13_date_stable_across_config_changed_events(context, loki_container):
+def test_v13_date_stable_across_config_changed_events(context, loki_container, tmp_path):
     """GIVEN a fully configured Loki with a v13 date already pushed.
 
     WHEN config-changed fires again (e.g. pod churn on a later day)
     THEN the v13 date in the config pushed to the container must remain unchanged.
     """
-    state_in = State(containers=[loki_container], leader=True)
+    # Mount the workload directories so that the files pushed in run 1 persist in run 2.
+    (tmp_path / "etc").mkdir()
+    (tmp_path / "chunks").mkdir()
+    container = dataclasses.replace(
+        loki_container,
+        mounts={
+            "config": Mount(location="/etc/loki", source=tmp_path / "etc"),
+            "chunks": Mount(location="/loki/chunks", source=tmp_path / "chunks"),
+        },
+    )
+    state_in = State(containers=[container], leader=True)
 
     # Run 1: charm computes the v13 date (no backup present) and writes it to
     # both LOKI_CONFIG and LOKI_CONFIG_BACKUP.
@@ -0,0 +1,115 @@
+import dataclasses
+from io import BytesIO
+from unittest.mock import patch
+
+import ops
+import pytest
+import yaml
+from ops.model import ActiveStatus, MaintenanceStatus
+from ops.testing import CheckInfo, Container, State, pebble
+
+from charm import READY_CHECK, LokiOperatorCharm
+from config_builder import LOKI_CONFIG
+
+
+def _container(loki_container: Container, ready: ops.pebble.CheckStatus) -> Container:
+    """A running Loki container whose ready check has the given status."""
+    layer = pebble.Layer(
+        {
+            "services": {"loki": {}},
+            "checks": {READY_CHECK: {"level": "ready", "http": {"url": "http://fqdn:3100/ready"}}},
+        }
+    )
+    return dataclasses.replace(
+        loki_container,
+        layers={"loki": layer},
+        service_statuses={"loki": ops.pebble.ServiceStatus.ACTIVE},
+        check_infos={CheckInfo(READY_CHECK, level=ops.pebble.CheckLevel.READY, status=ready)},
+    )
+
+
+METRICS = """\
+# HELP loki_ingester_wal_replay_active Whether the WAL is replaying
+# TYPE loki_ingester_wal_replay_active gauge
+loki_ingester_wal_replay_active {active}
+# HELP loki_ingester_wal_recovered_bytes_total Total number of bytes recovered from the WAL.
+# TYPE loki_ingester_wal_recovered_bytes_total counter
+loki_ingester_wal_recovered_bytes_total 2.5e+08
+"""
+
+
+def test_wal_tuning_is_rendered(context, loki_container):
+    # GIVEN a memory limit and a WAL checkpoint duration
+    state = State(
+        leader=True,
+        config={"memory": "4Gi", "wal-checkpoint-duration": "1m"},
+        containers=[loki_container],
+    )
+
+    # WHEN config-changed fires
+    with patch.object(LokiOperatorCharm, "_update_cert"):
+        out = context.run(context.on.config_changed(), state)
+
+    # THEN the WAL config is tuned accordingly
+    fs = out.get_container("loki").get_filesystem(context)
+    wal = yaml.safe_load((fs / LOKI_CONFIG.lstrip("/")).read_text())["ingester"]["wal"]
+    assert wal["checkpoint_duration"] == "1m"
+    assert wal["replay_memory_ceiling"] == "2048MiB"
+
+
+@pytest.mark.parametrize(
+    "active, wal_size, expected_status",
+    [
+        (1, 10**9, MaintenanceStatus("Replaying WAL (25%)")),
+        (1, 0, MaintenanceStatus("Replaying WAL")),
+        (1, 10**8, MaintenanceStatus("Replaying WAL (99%)")),
+        (0, 10**9, ActiveStatus()),
+    ],
+)
+def test_wal_replay_progress_is_reported(
+    context, loki_container, active, wal_size, expected_status
+):
+    # GIVEN Loki is not ready, and reports its WAL replay state in its metrics
+    container = _container(loki_container, ops.pebble.CheckStatus.DOWN)
+    state = State(leader=True, containers=[container])
+
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch.object(
+        LokiOperatorCharm, "_wal_size", return_value=wal_size
+    ), patch("urllib.request.urlopen") as mock_request:
+        mock_request.return_value = BytesIO(METRICS.format(active=active).encode())
+
+        # WHEN any event fires
+        out = context.run(context.on.update_status(), state)
+
+    # THEN the unit status reflects the replay progress
+    assert out.unit_status == expected_status
+
+
+def test_unreachable_metrics_do_not_affect_status(context, loki_container):
+    # GIVEN Loki's metrics endpoint is unreachable
+    container = _container(loki_container, ops.pebble.CheckStatus.DOWN)
+    state = State(leader=True, containers=[container])
+
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch(
+        "urllib.request.urlopen", side_effect=ConnectionRefusedError()
+    ):
+        out = context.run(context.on.update_status(), state)
+
+    # THEN the charm stays active
+    assert out.unit_status == ActiveStatus()
+
+
+def test_metrics_are_not_fetched_once_loki_is_ready(context, loki_container):
+    # GIVEN Loki reports ready
+    container = _container(loki_container, ops.pebble.CheckStatus.UP)
+    state = State(leader=True, containers=[container])
+
+    # WHEN any event fires
+    with patch.object(LokiOperatorCharm, "_update_cert"), patch(
+        "urllib.request.urlopen"
+    ) as mock_request:
+        out = context.run(context.on.update_status(), state)
+
+    # THEN the metrics are not fetched
+    assert not any("/metrics" in str(call.args[0]) for call in mock_request.call_args_list)
+    assert out.unit_status == ActiveStatus()